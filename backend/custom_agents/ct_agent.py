@@ -9,7 +9,9 @@ from providers.ct_providers import (
     link_topics,
     list_topics,
     record_topic_signals,
+    record_topic_signals_batch,
 )
+from providers.topic_index import match_topics
 
 today = date.today().isoformat()
 
@@ -20,7 +22,8 @@ Ziel: Das Event genau EINEM Primary-Topic zuordnen. Zusätzlich darfst du weiter
 Falls ein neues spezifisches Topic angelegt wird, verlinke es auch mit einem passenden Basistopic (Kategorie-Bezug).
 
 Vorgehen:
-1) Bestehende Topics durch list_topics tool aufrufen.
+1) Kandidaten über match_topics(text, scope) holen (Top-k nach semantischer Ähnlichkeit, mit similarity-Score).
+   list_topics nur nutzen, wenn du gezielt ein Topic (z.B. ein Basistopic) nachschlagen musst.
 2) ensure_baseline_topics(scope) aufrufen (idempotent).
 3) Matching-Priorität (Hinweise, nicht starr):
    - Incident-Signale (timeout, 500, outage, error, bug) -> 'Incident / Bug'.
@@ -42,9 +45,10 @@ Zuweisung:
    - Verlinke weitere passende Topics zusätzlich mit assign_event_to_topic(event_id, topic_id, role='secondary').
    - Es können auch >2 Topics sekundär verlinkt werden, wenn eindeutig begründbar.
 7) Falls Primary ein **neues spezifisches Topic** ist (z. B. '2FA Enforcement Admin Control'), prüfe, ob es einer Basiskategorie zugeordnet werden sollte:
-   - Suche Basistopic per list_topics.
+   - Suche Basistopic per match_topics bzw. list_topics(scope, search=<Titel>).
    - Falls gefunden, setze link_topics(spezifisches_topic_id, basistopic_id, relation_type='category').
 8) Danach IMMER: record_topic_signals(topic_id=<primary_topic_id>, event_id, actor_id, object_key, urls, ts=timestamp).
+   Sollen auch Secondary-Topics Signale bekommen: EIN Aufruf record_topic_signals_batch(signals=[...]) für alle Topics.
 
 Policies:
 - 'General Discussion' NUR für echtes Smalltalk/Meta. Operative/organisatorische Inhalte (z.B. Büroumzug, Budget, Deadlines) bekommen eigene Topics.
@@ -63,10 +67,12 @@ ct_agent = Agent(
     instructions=instructions,
     model="gpt-5",
     tools=[
+        match_topics,
         list_topics,
         create_topic,
         assign_event_to_topic,
         record_topic_signals,
+        record_topic_signals_batch,
         ensure_baseline_topics,
         link_topics,
     ],
@@ -2,6 +2,7 @@ from agents import Agent
 from dotenv import load_dotenv
 from models import SuccessResponse, UserContext
 from providers.jira_providers import get_all_users_for_project, get_issues_for_project
+from providers.plan_diff import diff_plan_against_jira
 from providers.supabase_providers import (
     append_or_replace_plan_item,
     delete_plan_item,
@@ -34,6 +35,8 @@ Antworte immer nur mit sehr kurzem Plain-Text (kein JSON/Markdown).
 2) get_all_users_for_project() → User-Mapping (accountId bevorzugt).
 3) get_plan_for_context() → Textliste "KEY | TYPE | SUMMARY" in den Kontext laden.
 4) Falls Inhalte fehlen: niemals Rückfragen stellen. Immer aus (1) und (3) ableiten.
+5) Abgleich Plan ↔ Jira NICHT selbst berechnen: diff_plan_against_jira() liefert das minimale
+   Changeset (creates/updates/moves/deletes). Bei in_sync=true ist nichts zu tun.
 
 ## Autonomie (keine Rückfragen)
 - Stelle **keine** Rückfragen zu Namen/Beschreibungen/Labels/Due-Dates.
@@ -73,7 +76,7 @@ Antworte immer nur mit sehr kurzem Plain-Text (kein JSON/Markdown).
 - Setze immer explizit parent_issue_key für jede Sub-task.
 
 ## Matching, Dedupe, Felder
-- Matching: primär exakter Key; sekundär Summary+Issue-Typ (case-insensitive).
+- Matching: primär exakter Key; sekundär Summary+Parent (normalisiert) – siehe diff_plan_against_jira().
 - Create: nur notwendige Felder; fehlende Angaben kreativ & sinnvoll ergänzen.
 - Update: nur gewünschte Felder ändern. Keine stillen Reparentings.
 - Nach relevanten Änderungen immer get_plan_for_context() aktualisieren.
@@ -90,6 +93,7 @@ planner_agent = Agent[UserContext](
         get_issues_for_project,
         get_all_users_for_project,
         get_plan_for_context,
+        diff_plan_against_jira,
         append_or_replace_plan_item,
         update_plan_item_fields,
         delete_plan_item,
@@ -110,6 +114,7 @@ planner_agent = Agent[UserContext](
         get_issues_for_project,
         get_all_users_for_project,
         get_plan_for_context,
+        diff_plan_against_jira,
         append_or_replace_plan_item,  # Create
         update_plan_item_fields,  # Update
         delete_plan_item,  # Delete
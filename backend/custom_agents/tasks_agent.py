@@ -4,7 +4,12 @@ from typing import List
 from agents import Agent
 from dotenv import load_dotenv
 from models import TaskSuggestion, UserContext
-from providers.tasks_providers import get_captain_tasks, get_issues_context, update_task
+from providers.tasks_providers import (
+    get_captain_tasks,
+    get_issues_context,
+    update_task,
+    update_tasks,
+)
 
 load_dotenv(override=True)
 
@@ -13,9 +18,9 @@ today = date.today().isoformat()
 instructions = f"""
 Heute ist {today}. Ziel: Pro Jira-Issue nur wirklich neue Tasks erzeugen – oder bestehende ergänzen, wenn neue Infos zur gleichen Sache hinzukommen.
 Ablauf: ZUERST genau einmal get_captain_tasks() (inkl. id/updated_at/description/plan), DANN genau einmal get_issues_context().
-Pro Issue betrachte nur Events NACH der jüngsten Task; wenn die neuen Events dieselbe Absicht wie eine vorhandene Task ausdrücken, rufe update_task auf.
+Pro Issue betrachte nur Events NACH der jüngsten Task; wenn die neuen Events dieselbe Absicht wie eine vorhandene Task ausdrücken, ergänze sie – alle Ergänzungen gesammelt in EINEM update_tasks-Aufruf (update_task nur für eine einzelne Task).
 Nur wenn der Kandidat inhaltlich deutlich NEU ist, erzeuge genau EINE TaskSuggestion (Titel <12 Wörter, kurze reason/description, sinnvolle priority, knapper plan); pro Issue max. 1 neue Task je Lauf.
-Ausgabe: List[TaskSuggestion] (JSON, kein Freitext); nutze nur get_captain_tasks(), get_issues_context(), update_task(); wenn nur Updates nötig waren, gib [] zurück.
+Ausgabe: List[TaskSuggestion] (JSON, kein Freitext); nutze nur get_captain_tasks(), get_issues_context(), update_tasks()/update_task(); wenn nur Updates nötig waren, gib [] zurück.
 """
 
 
@@ -23,6 +28,6 @@ tasks_agent = Agent[UserContext](
     name="Tasks Agent",
     instructions=instructions,
     model="gpt-5",
-    tools=[get_issues_context, get_captain_tasks, update_task],
+    tools=[get_issues_context, get_captain_tasks, update_tasks, update_task],
     output_type=List[TaskSuggestion],
 )
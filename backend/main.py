@@ -1,13 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from providers import credentials, supabase_client, topic_index, topic_summarizer
 from routes.blocker import router as blocker_router
+from routes.captains import router as captains_router
 from routes.chat import router as chat_router
 from routes.ct import router as ct_router
+from routes.credentials import router as credentials_router
+from routes.plan import router as plan_router
 from routes.tasks import router as tasks_router
 from routes.ticket_maintenance import router as ticket_maintenance_router
+from routes.topics import router as topics_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Gemeinsamer PostgREST-Client (Keep-Alive) für alle Routes
+    await supabase_client.startup()
+    # Rollierende Topic-Summaries im Hintergrund
+    summaries = None
+    if topic_summarizer.SUMMARY_INTERVAL_SECONDS > 0:
+        summaries = asyncio.create_task(topic_summarizer.summary_loop())
+    # Topics ohne Embedding nachindizieren (nicht auf dem Suchpfad)
+    backfill = None
+    if topic_index.BACKFILL_INTERVAL_SECONDS > 0:
+        backfill = asyncio.create_task(topic_index.backfill_loop())
+    # Jira-Tokens aktiver User vorab erneuern (nicht auf dem Request-Pfad)
+    token_refresh = None
+    if credentials.JIRA_REFRESH_INTERVAL_SECONDS > 0:
+        token_refresh = asyncio.create_task(credentials.refresh_loop())
+    yield
+    for task in (summaries, backfill, token_refresh):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await supabase_client.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -25,6 +59,10 @@ app.include_router(chat_router, prefix="/api/chat", tags=["Chat"])
 app.include_router(blocker_router, prefix="/api/blocker", tags=["Blocker"])
 app.include_router(ct_router, prefix="/api/context-thread", tags=["Context Thread"])
 app.include_router(tasks_router, prefix="/api/tasks", tags=["Tasks"])
+app.include_router(plan_router, prefix="/api/plan", tags=["Plan"])
+app.include_router(topics_router, prefix="/api/topics", tags=["Topics"])
+app.include_router(captains_router, prefix="/api/captains", tags=["Captains"])
+app.include_router(credentials_router, prefix="/api/credentials", tags=["Credentials"])
 app.include_router(
     ticket_maintenance_router,
     prefix="/api/ticket-maintenance",
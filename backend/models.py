@@ -103,6 +103,14 @@ class UserContext(BaseModel):
     channels: Optional[List[str]] = Field(
         default=None, description="Liste der für das Projekt aktivierten Channel-IDs"
     )
+    issue_keys: Optional[List[str]] = Field(
+        default=None,
+        description="Nur diese Issues betrachten (inkrementeller Tasks-Lauf); None = alle",
+    )
+    window_hours: Optional[float] = Field(
+        default=None,
+        description="Event-Zeitfenster in Stunden (z. B. 24); None = Standard (30 Tage)",
+    )
     today: str = Field(
         default_factory=lambda: date.today().isoformat(),
         description="Das aktuelle Tagesdatum im Format YYYY-MM-DD",
@@ -276,6 +284,40 @@ class CTDecision(BaseModel):
     )
 
 
+class TopicSignals(BaseModel):
+    """Signale eines Events für ein Topic (für record_topic_signals_batch)."""
+
+    topic_id: str = Field(..., min_length=3, description="Ziel-Topic-ID.")
+    event_id: str = Field(..., description="Event, aus dem die Signale stammen.")
+    actor_id: Optional[str] = Field(
+        None, description="Akteur des Events → participants."
+    )
+    object_key: Optional[str] = Field(
+        None, description="Issue-Key (z. B. 'BIDA-12') → Anker 'jira:<KEY>'."
+    )
+    urls: List[str] = Field(
+        default_factory=list, description="URLs des Events → Anker 'url:<URL>'."
+    )
+    ts: Optional[str] = Field(
+        None, description="Event-Zeitstempel (ISO 8601) → last_event_ts, falls neuer."
+    )
+
+
+class TopicSummary(BaseModel):
+    topic_id: str = Field(..., description="Topic-ID aus der Eingabe (unverändert).")
+    summary: str = Field(
+        ...,
+        max_length=1200,
+        description="Aktualisierte, rollierende Zusammenfassung des Topics (max. ca. 5 Sätze).",
+    )
+
+
+class TopicSummaryBatch(BaseModel):
+    summaries: List[TopicSummary] = Field(
+        default_factory=list, description="Genau ein Eintrag je Topic der Eingabe."
+    )
+
+
 class EventLite(BaseModel):
     event_id: str
     t: str
@@ -344,6 +386,29 @@ class TaskRow(BaseModel):
     updated_at: str = Field(..., description="Zuletzt geändert (timestamptz)")
 
 
+class TaskRowPatch(BaseModel):
+    id: str = Field(..., description="Task-UUID der zu ändernden Task")
+    issue_key: Optional[str] = Field(None, description="Neuer Jira-Key (optional)")
+    title: Optional[str] = Field(None, description="Neuer Titel (optional)")
+    reason: Optional[str] = Field(None, description="Neue Kurzbegründung (optional)")
+    priority: Optional[Literal["low", "medium", "high"]] = Field(
+        None, description="Neue Priorität (optional)"
+    )
+    status: Optional[
+        Literal["pending_approval", "in_progress", "done", "cancelled"]
+    ] = Field(None, description="Neuer Status (optional)")
+    description: Optional[str] = Field(
+        None, description="Text für description (siehe description_mode)"
+    )
+    description_mode: Literal["append", "replace"] = Field(
+        "append", description="append = an bestehende description anhängen"
+    )
+    plan: Optional[str] = Field(None, description="Text für plan (siehe plan_mode)")
+    plan_mode: Literal["append", "replace"] = Field(
+        "append", description="append = an bestehenden plan anhängen"
+    )
+
+
 class IssueChange(BaseModel):
     key: str
     changes: List[
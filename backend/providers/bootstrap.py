@@ -0,0 +1,85 @@
+# providers/bootstrap.py
+# Request-Bootstrap für Chat/Blocker/Ticket-Maintenance: Captain-Meta, Jira- und
+# Slack-Creds sind unabhängig und werden parallel geladen – jede Abhängigkeit mit
+# eigenem Timeout, Pflicht/optional entscheidet, ob ein Fehler den Request abbricht.
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+from providers.captains import get_captain_meta
+from providers.credentials import get_jira_credentials, get_slack_credentials
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_TIMEOUTS = {
+    "captain": float(os.getenv("BOOTSTRAP_CAPTAIN_TIMEOUT_SECONDS", "5")),
+    # deckt einen Token-Refresh bei Atlassian (20 s) mit ab
+    "jira": float(os.getenv("BOOTSTRAP_JIRA_TIMEOUT_SECONDS", "25")),
+    "slack": float(os.getenv("BOOTSTRAP_SLACK_TIMEOUT_SECONDS", "5")),
+}
+
+
+def _consume(task: asyncio.Task) -> None:
+    # Ergebnis abgeschirmter Tasks nach Timeout abholen (keine "never retrieved"-Warnung)
+    if not task.cancelled():
+        task.exception()
+
+
+async def _load(name: str, coro: Awaitable[Any]) -> Any:
+    task = asyncio.ensure_future(coro)
+    task.add_done_callback(_consume)
+    try:
+        # shield: ein laufender Token-Refresh wird nach Timeout zu Ende geführt
+        # und persistiert, statt mitten im Rotieren abgebrochen zu werden
+        return await asyncio.wait_for(asyncio.shield(task), BOOTSTRAP_TIMEOUTS[name])
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504, detail=f"Bootstrap: {name} nicht rechtzeitig geladen"
+        )
+
+
+async def bootstrap(
+    user_id: Optional[str],
+    captain_id: Optional[str] = None,
+    *,
+    jira: bool = True,
+    slack: bool = True,
+    optional: Iterable[str] = (),
+) -> Dict[str, Optional[Dict]]:
+    """
+    Lädt die angefragten Abhängigkeiten parallel. Rückgabe {"captain", "jira", "slack"};
+    None für nicht angefragte bzw. optionale, fehlgeschlagene Abhängigkeiten.
+    Fehler von Pflicht-Abhängigkeiten werden (in dieser Reihenfolge) geworfen:
+    HTTPException unverändert, sonst 500.
+    """
+    optional = set(optional)
+    pending: Dict[str, Awaitable[Any]] = {}
+    if captain_id:
+        pending["captain"] = get_captain_meta(captain_id)
+    if jira and user_id:
+        pending["jira"] = get_jira_credentials(user_id)
+    if slack and user_id:
+        pending["slack"] = get_slack_credentials(user_id)
+
+    results = await asyncio.gather(
+        *(_load(name, coro) for name, coro in pending.items()),
+        return_exceptions=True,
+    )
+
+    out: Dict[str, Optional[Dict]] = {"captain": None, "jira": None, "slack": None}
+    for name, res in zip(pending, results):
+        if isinstance(res, asyncio.CancelledError):
+            raise res
+        if not isinstance(res, Exception):
+            out[name] = res
+            continue
+        if name in optional:
+            logger.warning("[bootstrap] optional %s failed: %s", name, res)
+            continue
+        if isinstance(res, HTTPException):
+            raise res
+        logger.error("[bootstrap] %s failed: %r", name, res)
+        raise HTTPException(status_code=500, detail=f"Bootstrap {name} Fehler: {res}")
+    return out
@@ -0,0 +1,51 @@
+# providers/captains.py
+# Captain-Metadaten (jira_project_key, channels) für alle Routes aus einem
+# In-Process-Cache mit TTL. Captain-Settings ändern sich selten, werden aber bei
+# jedem Call gelesen; Änderungen werden per invalidate() bzw. Endpoint sofort sichtbar.
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from providers import supabase_client as db
+
+CAPTAIN_META_COLUMNS = "jira_project_key,channels"
+CAPTAIN_CACHE_TTL_SECONDS = float(os.getenv("CAPTAIN_CACHE_TTL_SECONDS", "300"))
+
+_meta: Dict[str, Tuple[float, Dict]] = {}  # captain_id → (geladen um, Meta)
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _cached(captain_id: str) -> Optional[Dict]:
+    entry = _meta.get(captain_id)
+    if entry is None or time.monotonic() - entry[0] > CAPTAIN_CACHE_TTL_SECONDS:
+        return None
+    return dict(entry[1])
+
+
+async def get_captain_meta(captain_id: str) -> Dict:
+    """jira_project_key + channels eines Captains (404, wenn es ihn nicht gibt)."""
+    meta = _cached(captain_id)
+    if meta is not None:
+        return meta
+    async with _locks.setdefault(captain_id, asyncio.Lock()):
+        meta = _cached(captain_id)
+        if meta is not None:
+            return meta
+        row = await db.select_one(
+            "captains", {"id": db.eq(captain_id)}, columns=CAPTAIN_META_COLUMNS
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Captain nicht gefunden")
+        _meta[captain_id] = (time.monotonic(), row)
+        return dict(row)
+
+
+def invalidate(captain_id: Optional[str] = None) -> int:
+    """Cache eines Captains (oder komplett) verwerfen; gibt die Anzahl Einträge zurück."""
+    if captain_id is None:
+        n = len(_meta)
+        _meta.clear()
+        return n
+    return 1 if _meta.pop(captain_id, None) is not None else 0
@@ -0,0 +1,377 @@
+# providers/credentials.py
+# Jira-/Slack-Credentials je User an einer Stelle: normalisiert, im Prozess gecacht
+# (Jira bis kurz vor Token-Ablauf), Refresh single-flight je User – parallele
+# Requests mit ablaufendem Token teilen sich einen Refresh und einen DB-Write.
+# refresh_loop() erneuert Tokens aktiver User vorab im Hintergrund.
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from providers import supabase_client as db
+
+load_dotenv(override=True)
+
+logger = logging.getLogger(__name__)
+
+JIRA_CLIENT_ID = os.getenv("JIRA_CLIENT_ID")
+JIRA_CLIENT_SECRET = os.getenv("JIRA_CLIENT_SECRET")
+JIRA_TOKEN_URL = "https://auth.atlassian.com/oauth/token"
+
+# Refresh, sobald der Access-Token weniger als so viele Sekunden gültig ist
+JIRA_REFRESH_SKEW_SECONDS = 60
+# Obergrenze je Cache-Eintrag (holt neu verbundene/entfernte Zugänge nach)
+CREDENTIALS_TTL_SECONDS = float(os.getenv("CREDENTIALS_TTL_SECONDS", "300"))
+
+# Hintergrund-Refresh (0 = aus, dann nur auf dem Request-Pfad)
+JIRA_REFRESH_INTERVAL_SECONDS = float(os.getenv("JIRA_REFRESH_INTERVAL_SECONDS", "60"))
+# Tokens, die innerhalb dieses Fensters ablaufen, werden vorab erneuert
+JIRA_REFRESH_AHEAD_SECONDS = int(os.getenv("JIRA_REFRESH_AHEAD_SECONDS", "600"))
+# Aktiv = Jira-Creds in diesem Zeitraum angefragt (deckt Idle-Phasen ab)
+JIRA_ACTIVE_USER_SECONDS = float(os.getenv("JIRA_ACTIVE_USER_SECONDS", "86400"))
+JIRA_REFRESH_BATCH_SIZE = int(os.getenv("JIRA_REFRESH_BATCH_SIZE", "50"))
+JIRA_REFRESH_CONCURRENCY = int(os.getenv("JIRA_REFRESH_CONCURRENCY", "4"))
+JIRA_REFRESH_BACKOFF_BASE = 30.0
+JIRA_REFRESH_BACKOFF_MAX = 1800.0
+
+_jira: Dict[str, Tuple[float, Dict]] = {}  # user_id → (geladen um, Creds)
+_slack: Dict[str, Tuple[float, Dict]] = {}
+_locks: Dict[str, asyncio.Lock] = {}
+_last_used: Dict[str, float] = {}  # user_id → letzte Anfrage (monotonic)
+# user_id → (nächster Versuch, Fehlversuche) für den Hintergrund-Refresh
+_backoff: Dict[str, Tuple[float, int]] = {}
+# user_id → rotierte Creds, deren DB-Write fehlschlug (Atlassian kennt nur noch diese)
+_unpersisted: Dict[str, Dict] = {}
+
+
+def _pick(d: Dict[str, Any], *keys: str, default: Any = None) -> Any:
+    for k in keys:
+        if k in d and d[k] is not None:
+            return d[k]
+    return default
+
+
+def _to_epoch(value: Any) -> Optional[int]:
+    """Accepts ISO string or epoch-like; returns epoch seconds or None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            # ISO 8601 (strip trailing Z if present)
+            return int(
+                datetime.fromisoformat(value.replace("Z", ""))
+                .replace(tzinfo=timezone.utc)
+                .timestamp()
+            )
+        except Exception:
+            try:
+                return int(value)
+            except Exception:
+                return None
+    return None
+
+
+def _needs_refresh(creds: Dict) -> bool:
+    exp = creds.get("expires_at")
+    return exp is not None and exp - int(time.time()) <= JIRA_REFRESH_SKEW_SECONDS
+
+
+def _cached(cache: Dict[str, Tuple[float, Dict]], user_id: str) -> Optional[Dict]:
+    entry = cache.get(user_id)
+    if entry is None or time.monotonic() - entry[0] > CREDENTIALS_TTL_SECONDS:
+        return None
+    if cache is _jira and _needs_refresh(entry[1]):
+        return None
+    return dict(entry[1])
+
+
+def _lock(user_id: str) -> asyncio.Lock:
+    return _locks.setdefault(user_id, asyncio.Lock())
+
+
+def invalidate(user_id: str) -> bool:
+    """Cache eines Users verwerfen (z. B. nach Re-Auth oder Disconnect)."""
+    found = False
+    # Ungespeicherte rotierte Tokens sind danach überholt; sonst reiht
+    # _due_for_refresh den User für immer wieder ein
+    for cache in (_jira, _slack, _backoff, _unpersisted):
+        found = cache.pop(user_id, None) is not None or found
+    return found
+
+
+async def _select_connection(table: str, user_id: str) -> Optional[Dict]:
+    try:
+        return await db.select_one(table, {"user_id": db.eq(user_id)})
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Supabase {table} Fehler {e.response.status_code}: {e.response.text}",
+        )
+
+
+async def _load_jira(user_id: str) -> Dict:
+    row = await _select_connection("jira_connections", user_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Kein Jira-Zugang gefunden")
+
+    creds = {
+        "user_id": _pick(row, "user_id", "userId", default=user_id),
+        "email": _pick(row, "email", "jira_email"),
+        "jira_url": _pick(row, "jira_url", "base_url", "jiraBaseUrl"),
+        "access_token": _pick(row, "access_token", "accessToken"),
+        "refresh_token": _pick(row, "refresh_token", "refreshToken"),
+        "expires_at": _to_epoch(
+            _pick(row, "expires_at", "expiresAt", "expires_at_epoch")
+        ),
+        "cloud_id": _pick(row, "cloud_id", "cloudId"),
+    }
+
+    # Minimal-Check (Access/Cloud/URL/Email sind nötig für Upstream-Calls)
+    for req in ("email", "jira_url", "access_token", "cloud_id"):
+        if not creds.get(req):
+            raise HTTPException(
+                status_code=500, detail=f"Jira-Creds unvollständig: Feld '{req}' fehlt"
+            )
+    return creds
+
+
+async def _persist_jira_tokens(user_id: str, creds: Dict) -> bool:
+    try:
+        await db.update(
+            "jira_connections",
+            {
+                "access_token": creds["access_token"],
+                "refresh_token": creds["refresh_token"],
+                "expires_at": creds["expires_at"],
+            },
+            {"user_id": db.eq(user_id)},
+        )
+    except httpx.HTTPError as e:
+        # Neuer Token ist gültig und im Cache; der alte Refresh-Token ist bei Atlassian
+        # schon verbraucht → merken und beim nächsten Laden erneut schreiben
+        _unpersisted[user_id] = creds
+        logger.warning("[credentials] persisting jira tokens failed: %r", e)
+        return False
+    _unpersisted.pop(user_id, None)
+    return True
+
+
+async def _reconcile(user_id: str, creds: Dict) -> Dict:
+    """DB-Zeile mit lokal rotierten, noch nicht persistierten Tokens überlagern."""
+    pending = _unpersisted.get(user_id)
+    if pending is None:
+        return creds
+    if (pending.get("expires_at") or 0) <= (creds.get("expires_at") or 0):
+        # DB ist inzwischen neuer (anderer Prozess, Re-Auth)
+        _unpersisted.pop(user_id, None)
+        return creds
+    creds = {
+        **creds,
+        **{k: pending[k] for k in ("access_token", "refresh_token", "expires_at")},
+    }
+    await _persist_jira_tokens(user_id, creds)
+    return creds
+
+
+async def _refresh_jira(user_id: str, creds: Dict) -> Dict:
+    """
+    Tauscht den Refresh-Token bei Atlassian, legt das Ergebnis sofort in den Cache
+    (der alte Refresh-Token ist ab jetzt ungültig) und persistiert es einmal.
+    """
+    if not creds.get("refresh_token"):
+        # ohne Refresh-Token nichts zu tun – Upstream meldet ggf. 401
+        return creds
+    if not JIRA_CLIENT_ID or not JIRA_CLIENT_SECRET:
+        raise HTTPException(
+            status_code=500, detail="Jira OAuth Client-ID/Secret fehlen für Refresh"
+        )
+
+    payload = {
+        "grant_type": "refresh_token",
+        "client_id": JIRA_CLIENT_ID,
+        "client_secret": JIRA_CLIENT_SECRET,
+        "refresh_token": creds["refresh_token"],
+    }
+    async with httpx.AsyncClient(timeout=httpx.Timeout(20.0)) as client:
+        r = await client.post(
+            JIRA_TOKEN_URL, json=payload, headers={"Accept": "application/json"}
+        )
+    if r.status_code >= 500:
+        # Atlassian gestört – kein Grund für Re-Auth (Aufrufer entscheiden)
+        r.raise_for_status()
+    if r.status_code != 200:
+        # 401, damit das Frontend ggf. Re-Auth triggern kann
+        raise HTTPException(
+            status_code=401, detail=f"Jira-Refresh fehlgeschlagen: {r.text}"
+        )
+
+    data = r.json()
+    new_access = data.get("access_token")
+    expires_in = int(data.get("expires_in") or 0)
+    if not new_access or not expires_in:
+        raise HTTPException(
+            status_code=401, detail="Jira-Refresh: unvollständige Antwort"
+        )
+
+    refreshed = {
+        **creds,
+        "access_token": new_access,
+        # Atlassian liefert nicht immer einen neuen RT
+        "refresh_token": data.get("refresh_token") or creds["refresh_token"],
+        "expires_at": int(time.time()) + expires_in,
+    }
+    _jira[user_id] = (time.monotonic(), refreshed)
+    await _persist_jira_tokens(user_id, refreshed)
+    return refreshed
+
+
+async def get_jira_credentials(user_id: str, force_refresh: bool = False) -> Dict:
+    """
+    Normalisierte Jira-Creds eines Users mit garantiert gültigem access_token.
+    Rückgabe enthält immer: user_id, email, jira_url, access_token, refresh_token?,
+    expires_at (epoch), cloud_id.
+    """
+    _last_used[user_id] = time.monotonic()
+    if not force_refresh:
+        creds = _cached(_jira, user_id)
+        if creds is not None:
+            return creds
+
+    async with _lock(user_id):
+        # Wer auf den Lock gewartet hat, findet den Refresh des Vorgängers im Cache
+        creds = None if force_refresh else _cached(_jira, user_id)
+        if creds is not None:
+            return creds
+
+        # Immer die aktuelle DB-Zeile als Basis – ein anderer Prozess kann den
+        # Refresh-Token bereits rotiert haben
+        creds = await _reconcile(user_id, await _load_jira(user_id))
+        if force_refresh or _needs_refresh(creds):
+            try:
+                creds = await _refresh_jira(user_id, creds)
+            except httpx.HTTPError as e:
+                exp = creds.get("expires_at")
+                if exp is not None and exp <= int(time.time()):
+                    raise HTTPException(
+                        status_code=502, detail=f"Jira-Refresh nicht erreichbar: {e}"
+                    )
+                # Token noch gültig: weiter mit altem Token, nicht cachen
+                logger.warning("[credentials] jira refresh failed: %s", e)
+                return dict(creds)
+
+        _jira[user_id] = (time.monotonic(), creds)
+        return dict(creds)
+
+
+async def get_slack_credentials(user_id: str) -> Dict:
+    """Zeile aus slack_connections (gecacht)."""
+    row = _cached(_slack, user_id)
+    if row is not None:
+        return row
+    row = await _select_connection("slack_connections", user_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Kein Slack-Zugang gefunden")
+    _slack[user_id] = (time.monotonic(), row)
+    return dict(row)
+
+
+# =========================
+# Hintergrund-Refresh
+# =========================
+def _due_for_refresh() -> List[str]:
+    """Aktive User mit Token, der innerhalb von JIRA_REFRESH_AHEAD_SECONDS abläuft."""
+    now = time.monotonic()
+    horizon = int(time.time()) + JIRA_REFRESH_AHEAD_SECONDS
+    due = []
+    for user_id, used in list(_last_used.items()):
+        if now - used > JIRA_ACTIVE_USER_SECONDS:
+            _last_used.pop(user_id, None)
+            _backoff.pop(user_id, None)
+            continue
+        if _backoff.get(user_id, (0.0, 0))[0] > now:
+            continue
+        entry = _jira.get(user_id)
+        if entry is None:
+            continue  # nicht geladen/invalidiert → nächster Request lädt ohnehin
+        creds = entry[1]
+        exp = creds.get("expires_at")
+        if exp is not None and exp <= horizon and creds.get("refresh_token"):
+            due.append((exp, user_id))
+    # Früheste Abläufe zuerst; Rest kommt im nächsten Tick dran
+    due_ids = [user_id for _, user_id in sorted(due)[:JIRA_REFRESH_BATCH_SIZE]]
+    # Fehlgeschlagene Token-Writes in jedem Tick erneut versuchen
+    return due_ids + [u for u in _unpersisted if u not in due_ids]
+
+
+async def _refresh_ahead(user_id: str) -> bool:
+    async with _lock(user_id):
+        # Aktuelle DB-Zeile: ein anderer Prozess kann schon erneuert haben;
+        # lokal rotierte, noch nicht persistierte Tokens haben Vorrang
+        creds = await _reconcile(user_id, await _load_jira(user_id))
+        exp = creds.get("expires_at")
+        horizon = int(time.time()) + JIRA_REFRESH_AHEAD_SECONDS
+        refreshed = bool(creds.get("refresh_token")) and exp is not None
+        refreshed = refreshed and exp <= horizon
+        if refreshed:
+            creds = await _refresh_jira(user_id, creds)
+        _jira[user_id] = (time.monotonic(), creds)
+        return refreshed
+
+
+def _note_failure(user_id: str) -> None:
+    _, failures = _backoff.get(user_id, (0.0, 0))
+    failures += 1
+    delay = min(
+        JIRA_REFRESH_BACKOFF_BASE * 2 ** (failures - 1), JIRA_REFRESH_BACKOFF_MAX
+    )
+    _backoff[user_id] = (time.monotonic() + delay, failures)
+
+
+async def run_jira_refresh() -> Dict[str, int]:
+    """Ein Refresh-Tick über alle fälligen aktiven User (begrenzt parallel)."""
+    due = _due_for_refresh()
+    sem = asyncio.Semaphore(max(1, JIRA_REFRESH_CONCURRENCY))
+
+    async def one(user_id: str) -> str:
+        async with sem:
+            try:
+                refreshed = await _refresh_ahead(user_id)
+                _backoff.pop(user_id, None)
+                return "refreshed" if refreshed else "skipped"
+            except HTTPException as e:
+                if e.status_code in (401, 404):
+                    # Re-Auth nötig bzw. Zugang entfernt: nicht weiter versuchen,
+                    # der nächste Request meldet den Fehler ans Frontend
+                    invalidate(user_id)
+                    _last_used.pop(user_id, None)
+                    return "dropped"
+                logger.warning("[credentials] refresh %s failed: %s", user_id, e.detail)
+            except Exception as e:
+                logger.warning("[credentials] refresh %s failed: %s", user_id, e)
+            _note_failure(user_id)
+            return "failed"
+
+    stats = Counter(await asyncio.gather(*(one(u) for u in due)))
+    return {"due": len(due), **stats}
+
+
+async def refresh_loop() -> None:
+    """Hintergrund-Loop (läuft im App-Lifespan, wenn JIRA_REFRESH_INTERVAL_SECONDS > 0)."""
+    while True:
+        try:
+            stats = await run_jira_refresh()
+            if stats.get("refreshed") or stats.get("failed") or stats.get("dropped"):
+                logger.info("[credentials] %s", stats)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[credentials] refresh run failed")
+        await asyncio.sleep(JIRA_REFRESH_INTERVAL_SECONDS)
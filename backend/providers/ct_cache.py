@@ -0,0 +1,126 @@
+# providers/ct_cache.py
+# Zuordnungs-Cache für den Context-Thread: bereits verarbeitete Events (gleiche
+# event_id oder gleicher dedup_fingerprint, z. B. Webhook-Retries/Backfill-Replays)
+# bekommen ihre bestehende Zuordnung aus dccts_event_topics statt eines neuen Agent-Laufs.
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from models import CTDecision
+from providers.ct_providers import _assign_event_to_topic
+from providers.supabase_client import execute, supabase
+
+ASSIGNMENT_CACHE_SIZE = int(os.getenv("CT_ASSIGNMENT_CACHE_SIZE", "4096"))
+
+# In-Process-LRU: "event:<id>" / "fp:<fingerprint>" → Decision-Dict
+_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _keys(ev_min: Dict[str, Any]) -> List[str]:
+    keys = []
+    if ev_min.get("event_id"):
+        keys.append(f"event:{ev_min['event_id']}")
+    if ev_min.get("dedup_fingerprint"):
+        keys.append(f"fp:{ev_min['dedup_fingerprint']}")
+    return keys
+
+
+def remember_assignment(ev_min: Dict[str, Any], decision: Dict) -> None:
+    """Entscheidung eines erfolgreich verarbeiteten Events merken."""
+    if not isinstance(decision, dict) or not decision.get("topic_id"):
+        return
+    for k in _keys(ev_min):
+        _cache[k] = decision
+        _cache.move_to_end(k)
+    while len(_cache) > ASSIGNMENT_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+async def forget_assignment(ev_min: Dict[str, Any]) -> None:
+    """Für reprocess: Cache-Einträge und bestehende Links des Events entfernen."""
+    for k in _keys(ev_min):
+        _cache.pop(k, None)
+    if ev_min.get("event_id"):
+        await execute(
+            supabase.table("dccts_event_topics")
+            .delete()
+            .eq("event_id", ev_min["event_id"])
+        )
+
+
+def _decision_from_links(links: List[Dict]) -> Optional[Dict]:
+    primary = next((x for x in links if x.get("role") == "primary"), None)
+    if primary is None:
+        return None
+    secondary = sorted(
+        {x["topic_id"] for x in links if x["topic_id"] != primary["topic_id"]}
+    )
+    return CTDecision(
+        mode="attach",
+        topic_id=primary["topic_id"],
+        secondary=secondary,
+        reason="Event wurde bereits zugeordnet (Zuordnungs-Cache).",
+    ).model_dump()
+
+
+async def _links_for_events(event_ids: List[str]) -> List[Dict]:
+    res = await execute(
+        supabase.table("dccts_event_topics")
+        .select("event_id,topic_id,role")
+        .in_("event_id", event_ids)
+    )
+    return res.data or []
+
+
+async def lookup_assignment(ev_min: Dict[str, Any]) -> Optional[Dict]:
+    """
+    Bestehende Zuordnung für das Event (Decision-Dict) oder None.
+    Reihenfolge: In-Process-Cache → dccts_event_topics per event_id → per dedup_fingerprint.
+    Ein Treffer nur über den Fingerprint (Replay mit neuer event_id) wird für die
+    neue event_id übernommen, damit sie ebenfalls verlinkt ist.
+    """
+    event_id = ev_min.get("event_id")
+    fingerprint = ev_min.get("dedup_fingerprint")
+
+    for k in _keys(ev_min):
+        if k in _cache:
+            _cache.move_to_end(k)
+            decision = _cache[k]
+            if k.startswith("fp:") and event_id:
+                await _copy_links(event_id, decision)
+                remember_assignment(ev_min, decision)
+            return decision
+
+    if event_id:
+        decision = _decision_from_links(await _links_for_events([event_id]))
+        if decision:
+            remember_assignment(ev_min, decision)
+            return decision
+
+    if fingerprint:
+        res = await execute(
+            supabase.table("dccts_events")
+            .select("event_id")
+            .eq("dedup_fingerprint", fingerprint)
+            .limit(20)
+        )
+        ids = [r["event_id"] for r in (res.data or []) if r["event_id"] != event_id]
+        if ids:
+            links = await _links_for_events(ids)
+            # Erste bereits zugeordnete Variante gewinnt
+            for other in ids:
+                decision = _decision_from_links(
+                    [x for x in links if x["event_id"] == other]
+                )
+                if decision:
+                    if event_id:
+                        await _copy_links(event_id, decision)
+                    remember_assignment(ev_min, decision)
+                    return decision
+    return None
+
+
+async def _copy_links(event_id: str, decision: Dict) -> None:
+    await _assign_event_to_topic(event_id, decision["topic_id"], "primary")
+    for tid in decision.get("secondary") or []:
+        await _assign_event_to_topic(event_id, tid, "secondary")
@@ -0,0 +1,199 @@
+# providers/ct_classifier.py
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from models import CTDecision
+from providers.ct_providers import (
+    BASELINE_TOPICS,
+    _assign_event_to_topic,
+    _ensure_baseline_topics,
+    _record_topic_signals,
+    baseline_topic_id,
+    find_topics_by_anchor,
+)
+from providers.topic_index import match_topics_for_text
+
+# Schlüsselwörter je Basistopic (Präfix-Match an Wortgrenzen, case-insensitive).
+# Entspricht den Matching-Hinweisen in den ct_agent-Instruktionen.
+LEXICON: Dict[str, List[str]] = {
+    "Incident / Bug": [
+        "timeout",
+        "500",
+        "outage",
+        "error",
+        "bug",
+        "exception",
+        "crash",
+        "ausfall",
+        "störung",
+        "fehler",
+    ],
+    "Schedule Risk": [
+        "verzöger",
+        "verschieb",
+        "verschoben",
+        "delay",
+        "blockiert",
+        "blocked",
+        "blocker",
+        "deadline",
+    ],
+    "Resource Availability": [
+        "krank",
+        "abwesend",
+        "urlaub",
+        "capacity",
+        "kapazität",
+        "staffing",
+        "vacation",
+        "sick",
+        "out of office",
+    ],
+    "Decision Log": [
+        "entscheidung",
+        "entschieden",
+        "beschließen",
+        "beschlossen",
+        "we choose",
+        "decided",
+        "decision",
+    ],
+    "Meeting Notes": ["meeting", "agenda", "protokoll", "minutes"],
+}
+
+# Incidents brauchen laut Policy ein spezifisches Topic + ggf. Schedule-Risk-Link
+# → nie direkt auf das Basistopic legen, sondern an den Agent eskalieren.
+NO_DIRECT_ASSIGN = {"Incident / Bug"}
+# Mindestanzahl unterschiedlicher Treffer für eine eindeutige Lexikon-Entscheidung
+MIN_LEXICON_HITS = 2
+# Semantische Auto-Zuordnung: Mindest-Similarity des besten Topics und Abstand zum zweiten
+AUTO_ATTACH_SIMILARITY = float(os.getenv("CT_AUTO_ATTACH_SIMILARITY", "0.86"))
+AUTO_ATTACH_MARGIN = 0.05
+AUTO_ATTACH_MIN_CHARS = 40
+
+_BASELINE_TITLES = {title for title, _, _ in BASELINE_TOPICS}
+_PATTERNS = {
+    topic: [
+        re.compile(
+            r"\b" + re.escape(term) + (r"\b" if term.isdigit() else ""), re.IGNORECASE
+        )
+        for term in terms
+    ]
+    for topic, terms in LEXICON.items()
+}
+
+
+def lexicon_hits(text: str) -> Dict[str, int]:
+    """Anzahl unterschiedlicher Lexikon-Treffer je Basistopic (nur Topics mit Treffern)."""
+    hits: Dict[str, int] = {}
+    for topic, patterns in _PATTERNS.items():
+        n = sum(1 for p in patterns if p.search(text or ""))
+        if n:
+            hits[topic] = n
+    return hits
+
+
+def _decision(topic_id: str, reason: str, confidence: float) -> CTDecision:
+    return CTDecision(
+        mode="attach", topic_id=topic_id, reason=reason, confidence=confidence
+    )
+
+
+async def _resolve(ev_min: Dict[str, Any]) -> Optional[CTDecision]:
+    scope = ev_min.get("scope")
+    object_key = ev_min.get("object_key")
+    hits = lexicon_hits(ev_min.get("text") or "")
+
+    # 1) Anker: Issue ist bereits an ein spezifisches Topic gebunden
+    if object_key:
+        bound = [
+            t
+            for t in await find_topics_by_anchor(scope, f"jira:{object_key}")
+            if t.get("title") not in _BASELINE_TITLES
+        ]
+        if len(bound) == 1:
+            return _decision(
+                bound[0]["topic_id"],
+                f"Anker jira:{object_key} ist an Topic gebunden.",
+                0.9,
+            )
+        if len(bound) > 1:
+            # Mehrdeutig → nur eindeutig, wenn genau ein gebundenes Topic das Lexikon trifft
+            labelled = [
+                t
+                for t in bound
+                if any(lexicon_hits(t.get("title") or "").get(k) for k in hits)
+            ]
+            if len(labelled) == 1:
+                return _decision(
+                    labelled[0]["topic_id"],
+                    f"Anker jira:{object_key} + Lexikon-Treffer.",
+                    0.8,
+                )
+            return None
+
+    # 2) Lexikon: genau eine Kategorie mit starken Treffern, keine Konkurrenz
+    if len(hits) == 1:
+        topic, n = next(iter(hits.items()))
+        if n >= MIN_LEXICON_HITS and topic not in NO_DIRECT_ASSIGN:
+            await _ensure_baseline_topics(scope)
+            return _decision(
+                baseline_topic_id(scope, topic),
+                f"Eindeutige Lexikon-Treffer ({n}) für '{topic}'.",
+                0.75,
+            )
+
+    # 3) Embeddings: ein Topic liegt klar vorn
+    return await _resolve_semantic(ev_min)
+
+
+async def _resolve_semantic(ev_min: Dict[str, Any]) -> Optional[CTDecision]:
+    text = (ev_min.get("text") or "").strip()
+    if AUTO_ATTACH_SIMILARITY >= 1 or len(text) < AUTO_ATTACH_MIN_CHARS:
+        return None
+    try:
+        top = await match_topics_for_text(text, ev_min.get("scope"), k=2)
+    except Exception as e:
+        print(f"⚠️ Semantisches Matching fehlgeschlagen: {e}")
+        return None
+    if not top or top[0].get("title") in NO_DIRECT_ASSIGN:
+        return None
+
+    best = float(top[0].get("similarity") or 0.0)
+    second = float(top[1].get("similarity") or 0.0) if len(top) > 1 else 0.0
+    if best < AUTO_ATTACH_SIMILARITY or best - second < AUTO_ATTACH_MARGIN:
+        return None
+    return _decision(
+        top[0]["topic_id"],
+        f"Semantisch nächstes Topic (similarity {best:.2f}, Abstand {best - second:.2f}).",
+        round(min(best, 0.85), 2),
+    )
+
+
+async def classify_event(ev_min: Dict[str, Any]) -> Optional[CTDecision]:
+    """
+    Regel-/Anker-basierte Vorklassifikation vor dem ct_agent.
+    Löst eindeutige Fälle direkt (Zuordnung + Signale über die Provider-Funktionen)
+    und gibt die Entscheidung zurück; None → an den Agent eskalieren.
+    """
+    event_id = ev_min.get("event_id")
+    if not event_id or not ev_min.get("scope"):
+        return None
+
+    decision = await _resolve(ev_min)
+    if decision is None:
+        return None
+
+    linked = await _assign_event_to_topic(event_id, decision.topic_id, "primary")
+    if not linked.get("linked"):
+        return None
+    await _record_topic_signals(
+        decision.topic_id,
+        event_id,
+        actor_id=ev_min.get("actor_id"),
+        object_key=ev_min.get("object_key"),
+        urls=ev_min.get("urls"),
+        ts=ev_min.get("timestamp"),
+    )
+    return decision
@@ -1,16 +1,13 @@
 import hashlib
 import json
-import os
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from agents import function_tool
-from supabase import Client, create_client
-
-# ---------- Supabase Client ----------
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]  # Service Role (serverseitig!)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from models import TopicSignals
+from providers import topic_graph
+from providers.supabase_client import execute, supabase
+from providers.topic_index import index_topics_safe
 
 
 # ---------- Helpers ----------
@@ -76,7 +73,7 @@ def _payload(t: dict, include_context: bool) -> dict:
 
 
 @function_tool
-def list_topics(
+async def list_topics(
     scope: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 50,
@@ -86,7 +83,7 @@ def list_topics(
     Liefert Topics als JSON:
       {"topics":[{topic_id,title,scope,labels,status,created_at,updated_at,summary?,anchors?,participants?,last_event_ts?}], "count":N}
     - scope: optional (z.B. "acme:web")
-    - search: optional (ILIKE auf title/description)
+    - search: optional (Volltext über title/labels/description/anchors, nach Relevanz sortiert)
     - limit: 1..200 (Default 50)
     - include_context: summary/anchors/participants/last_event_ts mitliefern
     """
@@ -95,39 +92,32 @@ def list_topics(
     if include_context:
         cols += ",summary,anchors,participants,last_event_ts"
 
-    base = supabase.table("dccts_topics").select(cols).order("updated_at", desc=True)
-
     if search:
-        q1 = base.limit(limit)
-        if scope:
-            q1 = q1.eq("scope", scope)
-        q1 = q1.ilike("title", f"%{search}%").execute()
-
-        q2 = base.limit(limit)
-        if scope:
-            q2 = q2.eq("scope", scope)
-        q2 = q2.ilike("description", f"%{search}%").execute()
-
-        seen, rows = set(), []
-        for r in (q1.data or []) + (q2.data or []):
-            tid = r.get("topic_id")
-            if tid in seen:
-                continue
-            seen.add(tid)
-            rows.append(_payload(r, include_context))
-        rows = rows[:limit]
+        # Gerankte Volltextsuche (title/labels/description/anchors) in EINEM Query
+        res = await execute(
+            supabase.rpc(
+                "search_dccts_topics",
+                {"search_query": search, "match_scope": scope, "match_count": limit},
+            )
+        )
+        rows = [_payload(t, include_context) for t in (res.data or [])]
         return json.dumps({"topics": rows, "count": len(rows)}, ensure_ascii=False)
 
-    q = base.limit(limit)
+    q = (
+        supabase.table("dccts_topics")
+        .select(cols)
+        .order("updated_at", desc=True)
+        .limit(limit)
+    )
     if scope:
         q = q.eq("scope", scope)
-    res = q.execute()
+    res = await execute(q)
     rows = [_payload(t, include_context) for t in (res.data or [])]
     return json.dumps({"topics": rows, "count": len(rows)}, ensure_ascii=False)
 
 
 @function_tool
-def create_topic(
+async def create_topic(
     title: str,
     scope: Optional[str] = None,
     description: Optional[str] = None,
@@ -149,12 +139,8 @@ def create_topic(
     labs = normalize_labels(labels)
 
     # existiert bereits?
-    existing = (
-        supabase.table("dccts_topics")
-        .select("*")
-        .eq("topic_id", topic_id)
-        .limit(1)
-        .execute()
+    existing = await execute(
+        supabase.table("dccts_topics").select("*").eq("topic_id", topic_id).limit(1)
     )
     if existing.data:
         topic = existing.data[0]
@@ -166,21 +152,25 @@ def create_topic(
         if description and not (topic.get("description") or ""):
             patch["description"] = description
         if patch:
-            supabase.table("dccts_topics").update(patch).eq(
-                "topic_id", topic_id
-            ).execute()
+            await execute(
+                supabase.table("dccts_topics").update(patch).eq("topic_id", topic_id)
+            )
             topic.update(patch)
+            if "description" in patch:
+                await index_topics_safe([topic])
 
         if attach_event_id:
             # Link in n:m Tabelle (idempotent)
-            supabase.table("dccts_event_topics").upsert(
-                {
-                    "event_id": attach_event_id,
-                    "topic_id": topic_id,
-                    "role": attach_role,
-                },
-                on_conflict="event_id,topic_id",
-            ).execute()
+            await execute(
+                supabase.table("dccts_event_topics").upsert(
+                    {
+                        "event_id": attach_event_id,
+                        "topic_id": topic_id,
+                        "role": attach_role,
+                    },
+                    on_conflict="event_id,topic_id",
+                )
+            )
 
         payload = topic_payload(topic)
         payload["created"] = False
@@ -196,13 +186,21 @@ def create_topic(
         "created_by": "llm",
         "status": "active",
     }
-    supabase.table("dccts_topics").insert(insert_payload).execute()
+    await execute(supabase.table("dccts_topics").insert(insert_payload))
+    topic_graph.note_topic(insert_payload)
+    await index_topics_safe([insert_payload])
 
     if attach_event_id:
-        supabase.table("dccts_event_topics").upsert(
-            {"event_id": attach_event_id, "topic_id": topic_id, "role": attach_role},
-            on_conflict="event_id,topic_id",
-        ).execute()
+        await execute(
+            supabase.table("dccts_event_topics").upsert(
+                {
+                    "event_id": attach_event_id,
+                    "topic_id": topic_id,
+                    "role": attach_role,
+                },
+                on_conflict="event_id,topic_id",
+            )
+        )
 
     payload = {
         "topic_id": topic_id,
@@ -215,51 +213,94 @@ def create_topic(
     return json.dumps(payload, ensure_ascii=False)
 
 
-@function_tool
-def assign_event_to_topic(event_id: str, topic_id: str, role: str = "primary") -> str:
-    """
-    Verknüpft ein Event mit einem Topic (n:m, idempotent). Rückgabe:
-      {"event_id","topic_id","role","linked":true|false}
-    role: 'primary' oder 'secondary'
-    """
+async def _assign_event_to_topic(
+    event_id: str, topic_id: str, role: str = "primary"
+) -> Dict:
     # Topic existiert?
-    t = (
+    t = await execute(
         supabase.table("dccts_topics")
         .select("topic_id")
         .eq("topic_id", topic_id)
         .limit(1)
-        .execute()
     )
     if not t.data:
-        return json.dumps(
-            {
-                "event_id": event_id,
-                "topic_id": topic_id,
-                "role": role,
-                "linked": False,
-                "error": "topic_not_found",
-            },
-            ensure_ascii=False,
-        )
+        return {
+            "event_id": event_id,
+            "topic_id": topic_id,
+            "role": role,
+            "linked": False,
+            "error": "topic_not_found",
+        }
 
     # idempotent verlinken
-    res = (
-        supabase.table("dccts_event_topics")
-        .upsert(
+    await execute(
+        supabase.table("dccts_event_topics").upsert(
             {"event_id": event_id, "topic_id": topic_id, "role": role},
             on_conflict="event_id,topic_id",
         )
-        .execute()
     )
     linked = True  # upsert ist idempotent; wenn es schon da war, bleibt True
-    return json.dumps(
-        {"event_id": event_id, "topic_id": topic_id, "role": role, "linked": linked},
-        ensure_ascii=False,
+    return {"event_id": event_id, "topic_id": topic_id, "role": role, "linked": linked}
+
+
+@function_tool
+async def assign_event_to_topic(
+    event_id: str, topic_id: str, role: str = "primary"
+) -> str:
+    """
+    Verknüpft ein Event mit einem Topic (n:m, idempotent). Rückgabe:
+      {"event_id","topic_id","role","linked":true|false}
+    role: 'primary' oder 'secondary'
+    """
+    res = await _assign_event_to_topic(event_id, topic_id, role)
+    return json.dumps(res, ensure_ascii=False)
+
+
+def _signal_payload(
+    topic_id: str,
+    actor_id: Optional[str] = None,
+    object_key: Optional[str] = None,
+    urls: Optional[List[str]] = None,
+    ts: Optional[str] = None,
+) -> Dict:
+    anchors = [f"jira:{object_key}"] if object_key else []
+    anchors += [f"url:{u}" for u in urls or [] if u]
+    return {
+        "topic_id": topic_id,
+        "anchors": anchors,
+        "participants": [actor_id] if actor_id else [],
+        "ts": ts or None,
+    }
+
+
+async def _record_topic_signals(
+    topic_id: str,
+    event_id: str,
+    actor_id: Optional[str] = None,
+    object_key: Optional[str] = None,
+    urls: Optional[List[str]] = None,
+    ts: Optional[str] = None,
+) -> Dict:
+    # Atomare Array-Union + last_event_ts nur vorwärts (ein Round-Trip, keine Lost Updates)
+    sig = _signal_payload(topic_id, actor_id, object_key, urls, ts)
+    res = await execute(
+        supabase.rpc(
+            "dccts_record_topic_signals",
+            {
+                "p_topic_id": topic_id,
+                "p_anchors": sig["anchors"],
+                "p_participants": sig["participants"],
+                "p_ts": sig["ts"],
+            },
+        )
     )
+    if not res.data:
+        return {"ok": False, "error": "topic_not_found"}
+    return {"ok": True, "topic_id": topic_id}
 
 
 @function_tool
-def record_topic_signals(
+async def record_topic_signals(
     topic_id: str,
     event_id: str,
     actor_id: Optional[str] = None,
@@ -270,110 +311,149 @@ def record_topic_signals(
     """
     Aktualisiert anchors/participants/last_event_ts eines Topics (idempotent, ohne LLM).
     """
-    t = (
-        supabase.table("dccts_topics")
-        .select("anchors,participants")
-        .eq("topic_id", topic_id)
-        .limit(1)
-        .execute()
+    res = await _record_topic_signals(
+        topic_id, event_id, actor_id, object_key, urls, ts
     )
-    if not t.data:
-        return json.dumps({"ok": False, "error": "topic_not_found"}, ensure_ascii=False)
+    return json.dumps(res, ensure_ascii=False)
+
 
-    anchors = set(t.data[0].get("anchors") or [])
-    participants = set(t.data[0].get("participants") or [])
+async def _record_topic_signals_batch(signals: List[TopicSignals]) -> Dict:
+    payload = [
+        _signal_payload(s.topic_id, s.actor_id, s.object_key, s.urls, s.ts)
+        for s in signals
+    ]
+    if not payload:
+        return {"ok": True, "updated": [], "missing": []}
+    res = await execute(
+        supabase.rpc("dccts_record_topic_signals_batch", {"p_signals": payload})
+    )
+    updated = [r["topic_id"] for r in (res.data or [])]
+    missing = sorted({p["topic_id"] for p in payload} - set(updated))
+    return {"ok": not missing, "updated": updated, "missing": missing}
 
-    if object_key:
-        anchors.add(f"jira:{object_key}")
-    for u in urls or []:
-        anchors.add(f"url:{u}")
-    if actor_id:
-        participants.add(actor_id)
 
-    supabase.table("dccts_topics").update(
+@function_tool
+async def record_topic_signals_batch(signals: List[TopicSignals]) -> str:
+    """
+    Wie record_topic_signals, aber für viele (Topic, Event)-Paare in einem Aufruf.
+    Rückgabe: {"ok","updated":[topic_id...],"missing":[topic_id...]}
+    """
+    res = await _record_topic_signals_batch(signals)
+    return json.dumps(res, ensure_ascii=False)
+
+
+# Standard-Themen je Scope: (title, labels, description)
+BASELINE_TOPICS = [
+    (
+        "General Discussion",
+        ["pm", "discussion"],
+        "Allgemeine Konversation zum Projekt/Issue.",
+    ),
+    (
+        "Schedule Risk",
+        ["pm", "risk", "schedule"],
+        "Zeitplanrisiken, Verzögerungen, Blocker.",
+    ),
+    (
+        "Resource Availability",
+        ["pm", "people"],
+        "Krankheit, Urlaub, Kapazität, Staffing.",
+    ),
+    ("Decision Log", ["pm", "decision"], "Entscheidungen/ADR & Begründungen."),
+    ("Incident / Bug", ["pm", "incident", "bug"], "Störungen, Fehler, Ausfälle."),
+    ("Action Items", ["pm", "action"], "To-dos, nächste Schritte, Aufgaben."),
+    (
+        "Requirements & Scope",
+        ["pm", "requirements"],
+        "Anforderungen, Scope, Akzeptanzkriterien.",
+    ),
+    ("Meeting Notes", ["pm", "meeting"], "Agenda, Protokolle, Ergebnisse."),
+]
+
+
+def baseline_topic_id(scope: str, title: str) -> str:
+    return f"{scope}:topic:{slugify(title)}-{short_hash(scope+title)}"
+
+
+# Scopes, deren Basistopics in diesem Prozess bereits angelegt wurden
+_provisioned_scopes: Set[str] = set()
+
+
+async def _ensure_baseline_topics(scope: str) -> Dict:
+    if scope in _provisioned_scopes:
+        return {"ok": True, "created": [], "cached": True}
+
+    rows = [
         {
-            "anchors": list(anchors),
-            "participants": list(participants),
-            "last_event_ts": ts,
+            "topic_id": baseline_topic_id(scope, title),
+            "title": title,
+            "scope": scope,
+            "labels": labels,
+            "description": desc,
+            "created_by": "system",
+            "status": "active",
         }
-    ).eq("topic_id", topic_id).execute()
-
-    return json.dumps({"ok": True, "topic_id": topic_id}, ensure_ascii=False)
+        for title, labels, desc in BASELINE_TOPICS
+    ]
+    # Ein Bulk-Insert; bestehende Topics bleiben unverändert (ON CONFLICT DO NOTHING),
+    # zurück kommen nur die neu angelegten Zeilen.
+    res = await execute(
+        supabase.table("dccts_topics").upsert(
+            rows, on_conflict="topic_id", ignore_duplicates=True
+        )
+    )
+    created = [r["topic_id"] for r in (res.data or [])]
+    if created:
+        new_rows = [r for r in rows if r["topic_id"] in created]
+        for r in new_rows:
+            topic_graph.note_topic(r)
+        await index_topics_safe(new_rows)
+    _provisioned_scopes.add(scope)
+    return {"ok": True, "created": created}
 
 
 @function_tool
-def ensure_baseline_topics(scope: str) -> str:
+async def ensure_baseline_topics(scope: str) -> str:
     """
     Legt/aktualisiert Standard-Themen für einen Scope an (idempotent).
     """
-    presets = [
-        (
-            "General Discussion",
-            ["pm", "discussion"],
-            "Allgemeine Konversation zum Projekt/Issue.",
-        ),
-        (
-            "Schedule Risk",
-            ["pm", "risk", "schedule"],
-            "Zeitplanrisiken, Verzögerungen, Blocker.",
-        ),
-        (
-            "Resource Availability",
-            ["pm", "people"],
-            "Krankheit, Urlaub, Kapazität, Staffing.",
-        ),
-        ("Decision Log", ["pm", "decision"], "Entscheidungen/ADR & Begründungen."),
-        ("Incident / Bug", ["pm", "incident", "bug"], "Störungen, Fehler, Ausfälle."),
-        ("Action Items", ["pm", "action"], "To-dos, nächste Schritte, Aufgaben."),
-        (
-            "Requirements & Scope",
-            ["pm", "requirements"],
-            "Anforderungen, Scope, Akzeptanzkriterien.",
-        ),
-        ("Meeting Notes", ["pm", "meeting"], "Agenda, Protokolle, Ergebnisse."),
-    ]
-    created = []
-    for title, labels, desc in presets:
-        slug = slugify(title)
-        tid = f"{scope}:topic:{slug}-{short_hash(scope+title)}"
-        exist = (
-            supabase.table("dccts_topics")
-            .select("topic_id")
-            .eq("topic_id", tid)
-            .limit(1)
-            .execute()
-        )
-        if not exist.data:
-            supabase.table("dccts_topics").insert(
-                {
-                    "topic_id": tid,
-                    "title": title,
-                    "scope": scope,
-                    "labels": labels,
-                    "description": desc,
-                    "created_by": "system",
-                    "status": "active",
-                }
-            ).execute()
-            created.append(tid)
-    return json.dumps({"ok": True, "created": created}, ensure_ascii=False)
+    res = await _ensure_baseline_topics(scope)
+    return json.dumps(res, ensure_ascii=False)
+
+
+async def find_topics_by_anchor(scope: Optional[str], anchor: str) -> List[Dict]:
+    """Topics, deren anchors den Anker enthalten (z. B. 'jira:BIDA-12'), neueste zuerst."""
+    q = (
+        supabase.table("dccts_topics")
+        .select("topic_id,title,scope,labels,last_event_ts")
+        .contains("anchors", [anchor])
+        .order("last_event_ts", desc=True)
+        .limit(10)
+    )
+    if scope:
+        q = q.eq("scope", scope)
+    res = await execute(q)
+    return res.data or []
 
 
 @function_tool
-def link_topics(
+async def link_topics(
     topic_id: str, related_topic_id: str, relation_type: str = "category"
 ) -> str:
     """
     Verknüpft zwei Topics (idempotent).
     relation_type: 'category'|'related'|'blocks'|'caused_by'|'impacts'|'duplicate_of'
     """
-    supabase.table("dccts_topic_relations").upsert(
-        {
-            "topic_id": topic_id,
-            "related_topic_id": related_topic_id,
-            "relation_type": relation_type,
-        }
-    ).execute()
+    await execute(
+        supabase.table("dccts_topic_relations").upsert(
+            {
+                "topic_id": topic_id,
+                "related_topic_id": related_topic_id,
+                "relation_type": relation_type,
+            }
+        )
+    )
+    topic_graph.note_relation(topic_id, related_topic_id, relation_type)
     return json.dumps(
         {
             "ok": True,
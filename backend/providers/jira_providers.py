@@ -232,17 +232,33 @@ def assign_jira_issue(
         return f"❗ Fehler {response.status_code}: {response.text}"
 
 
-@function_tool
-def get_issues_for_project(wrapper: RunContextWrapper[UserContext]) -> list[Dict]:
+def _adf_to_text(node) -> str:
+    """Flacht ein ADF-Dokument (Jira-Beschreibung) zu Plain-Text ab."""
+    if isinstance(node, str):
+        return node
+    if not isinstance(node, dict):
+        return ""
+    if node.get("type") == "text":
+        return node.get("text") or ""
+    if node.get("type") == "hardBreak":
+        return "\n"
+    parts = [_adf_to_text(c) for c in node.get("content") or []]
+    # Inline-Inhalte zusammenziehen, Block-Elemente zeilenweise trennen
+    sep = "" if node.get("type") in ("paragraph", "heading") else "\n"
+    return sep.join(p for p in parts if p)
+
+
+def _fetch_project_issues(
+    ctx: UserContext, with_description: bool = False
+) -> list[Dict]:
     """
-    Lädt alle Issues eines Projekts aus dem verbundenen PM-Tool (hier Jira) und gibt
-    eine kompakte Liste für Agent-Analysen zurück – inkl. Status, Assignee, Labels, Duedate
-    und Kommentare.
+    Lädt alle Issues des Projekts und gibt die kompakte Struktur zurück, die auch
+    get_issues_for_project liefert. Mit with_description wird zusätzlich die
+    Beschreibung als Plain-Text geladen (für den Plan-Diff).
     """
-
-    access_token = wrapper.context.jira_token
-    cloud_id = wrapper.context.jira_cloudId
-    project_key = wrapper.context.jira_project_key
+    access_token = ctx.jira_token
+    cloud_id = ctx.jira_cloudId
+    project_key = ctx.jira_project_key
 
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -257,8 +273,10 @@ def get_issues_for_project(wrapper: RunContextWrapper[UserContext]) -> list[Dict
     # Labels + Kommentare mitladen (für Blocker-/Kontextanalyse)
     fields = (
         "summary,issuetype,assignee,status,comment,labels,"
-        "duedate,priority,statuscategorychangedate,updated"
+        "duedate,priority,statuscategorychangedate,updated,parent"
     )
+    if with_description:
+        fields += ",description"
 
     while True:
         jql = f"project={project_key}"
@@ -296,9 +314,11 @@ def get_issues_for_project(wrapper: RunContextWrapper[UserContext]) -> list[Dict
             "statuscategorychangedate"
         )  # ISO-String oder None
         updated = f.get("updated")  # ISO-String oder None
+        parent_key = (f.get("parent") or {}).get("key")
 
         assignee = f.get("assignee")
         assignee_name = assignee.get("displayName") if assignee else None
+        assignee_account_id = assignee.get("accountId") if assignee else None
 
         status_obj = f.get("status") or {}
         status_name = status_obj.get("name")
@@ -322,27 +342,40 @@ def get_issues_for_project(wrapper: RunContextWrapper[UserContext]) -> list[Dict
             for c in raw_comments
         ]
 
-        structured_issues.append(
-            {
-                "key": key,
-                "summary": summary,
-                "issue_type": issue_type,
-                "assignee": assignee_name,
-                "status": status_name,
-                "status_category": status_category,
-                "labels": labels,
-                "comments": comments,
-                "comments_total": (comment_field.get("total") or len(comments)),
-                "duedate": duedate,
-                "priority": priority,
-                "statuscategorychangedate": statuscategorychangedate,
-                "updated": updated,
-            }
-        )
+        item = {
+            "key": key,
+            "summary": summary,
+            "issue_type": issue_type,
+            "parent_key": parent_key,
+            "assignee": assignee_name,
+            "assignee_account_id": assignee_account_id,
+            "status": status_name,
+            "status_category": status_category,
+            "labels": labels,
+            "comments": comments,
+            "comments_total": (comment_field.get("total") or len(comments)),
+            "duedate": duedate,
+            "priority": priority,
+            "statuscategorychangedate": statuscategorychangedate,
+            "updated": updated,
+        }
+        if with_description:
+            item["description"] = _adf_to_text(f.get("description")) or None
+        structured_issues.append(item)
 
     return structured_issues
 
 
+@function_tool
+def get_issues_for_project(wrapper: RunContextWrapper[UserContext]) -> list[Dict]:
+    """
+    Lädt alle Issues eines Projekts aus dem verbundenen PM-Tool (hier Jira) und gibt
+    eine kompakte Liste für Agent-Analysen zurück – inkl. Status, Assignee, Labels, Duedate,
+    Parent und Kommentare.
+    """
+    return _fetch_project_issues(wrapper.context)
+
+
 @function_tool
 def get_all_users_for_project(wrapper: RunContextWrapper[UserContext]) -> list:
     """
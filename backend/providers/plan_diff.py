@@ -0,0 +1,261 @@
+# providers/plan_diff.py
+import asyncio
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents import RunContextWrapper, function_tool
+from models import UserContext
+from providers.jira_providers import _fetch_project_issues
+from providers.supabase_client import run_db
+from providers.supabase_providers import (
+    _as_fields_dict,
+    _extract_parent_key,
+    _fetch_plan,
+    _is_epic,
+    _is_subtask,
+    _lower_name,
+)
+
+# Felder, die zwischen Plan und Jira verglichen werden (Plan-Feldname → kanonisch)
+_FIELD_ALIASES = {
+    "summary": "summary",
+    "description": "description",
+    "status": "status",
+    "duedate": "duedate",
+    "due_date": "duedate",
+    "labels": "labels",
+    "assignee": "assignee",
+}
+
+
+# -------------------------------------------------
+# Normalisierung
+# -------------------------------------------------
+def _norm_text(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = re.sub(r"\s+", " ", str(v)).strip()
+    return s or None
+
+
+def normalize_summary(summary: Any) -> str:
+    """Summary für das Matching: Unicode-/Case-/Whitespace-normalisiert, ohne Rand-Satzzeichen."""
+    s = unicodedata.normalize("NFKC", str(summary or "")).casefold()
+    s = re.sub(r"\s+", " ", s).strip()
+    return s.strip(".,;:!?-–— ")
+
+
+def _account_id(v: Any) -> Optional[str]:
+    if isinstance(v, dict):
+        v = v.get("account_id") or v.get("accountId")
+    return _norm_text(v)
+
+
+def _canon(field: str, v: Any) -> Any:
+    """Kanonischer Vergleichswert je Feld."""
+    if field == "labels":
+        if not isinstance(v, list):
+            return []
+        return sorted({str(x).strip() for x in v if x is not None and str(x).strip()})
+    if field == "assignee":
+        return _account_id(v)
+    if field == "status":
+        s = _norm_text(v)
+        return s.casefold() if s else None
+    if field == "duedate":
+        s = _norm_text(v)
+        return s[:10] if s else None
+    if field == "description":
+        return (str(v).strip() or None) if v is not None else None
+    return _norm_text(v)
+
+
+def _plan_fields(item: Dict) -> Dict[str, Any]:
+    """Nur die im Plan-Item tatsächlich gesetzten, vergleichbaren Felder."""
+    f = _as_fields_dict(item.get("fields"))
+    out: Dict[str, Any] = {}
+    for name, canon in _FIELD_ALIASES.items():
+        if name in f and f[name] is not None:
+            out[canon] = f[name]
+    return out
+
+
+def _jira_fields(issue: Dict) -> Dict[str, Any]:
+    return {
+        "summary": issue.get("summary"),
+        "description": issue.get("description"),
+        "status": issue.get("status"),
+        "duedate": issue.get("duedate"),
+        "labels": issue.get("labels") or [],
+        "assignee": issue.get("assignee_account_id"),
+    }
+
+
+def _depth(item: Dict) -> int:
+    n = _lower_name(
+        _as_fields_dict(item.get("fields")).get("issuetype")
+        or _as_fields_dict(item.get("fields")).get("issue_type")
+    )
+    if _is_epic(n):
+        return 0
+    if _is_subtask(n):
+        return 2
+    return 1
+
+
+# -------------------------------------------------
+# Diff
+# -------------------------------------------------
+def changeset_hash(changeset: Dict) -> str:
+    """Stabiler Hash über creates/updates/moves/deletes (Reihenfolge-unabhängig serialisiert)."""
+    core = {
+        k: changeset.get(k) or [] for k in ("creates", "updates", "moves", "deletes")
+    }
+    raw = json.dumps(core, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def diff_plan(plan: List[Dict], issues: List[Dict]) -> Dict:
+    """
+    Vergleicht den Plan (captains.plan) deterministisch mit dem Jira-Stand.
+
+    Matching je Plan-Item:
+      1) exakter Jira-Key
+      2) normalisierte Summary + (aufgelöster) Parent-Key
+    Jedes Jira-Issue wird höchstens einmal gematcht. Parents werden in der Reihenfolge
+    Epic → Task → Sub-task aufgelöst, damit Temp-Keys (E001, T001) auf ihre Jira-Keys zeigen.
+
+    Rückgabe (minimales Changeset):
+      {"creates":[...], "updates":[...], "moves":[...], "deletes":[...],
+       "skipped":[...], "unchanged":N, "in_sync":bool, "hash":"..."}
+    """
+    by_key: Dict[str, Dict] = {i["key"]: i for i in issues if i.get("key")}
+    by_summary: Dict[Tuple[str, Optional[str]], List[Dict]] = {}
+    for i in issues:
+        sig = (normalize_summary(i.get("summary")), i.get("parent_key") or None)
+        by_summary.setdefault(sig, []).append(i)
+
+    # Stabile Verarbeitungsreihenfolge: Hierarchie-Ebene, dann Plan-Position
+    ordered = sorted(
+        (
+            (pos, it)
+            for pos, it in enumerate(plan)
+            if isinstance(it, dict) and it.get("key")
+        ),
+        key=lambda p: (_depth(p[1]), p[0]),
+    )
+
+    resolved: Dict[str, str] = {}  # Plan-Key → Jira-Key
+    matched: set = set()
+    creates: List[Dict] = []
+    updates: List[Dict] = []
+    moves: List[Dict] = []
+    deletes: List[Dict] = []
+    skipped: List[Dict] = []
+    unchanged = 0
+
+    for _, item in ordered:
+        ref = item["key"]
+        change = str(item.get("change") or "").lower()
+        f = _as_fields_dict(item.get("fields"))
+        parent_ref = _extract_parent_key(f)
+        parent = resolved.get(parent_ref, parent_ref) if parent_ref else None
+
+        issue = by_key.get(ref) if ref not in matched else None
+        if issue is None and f.get("summary"):
+            sig = (normalize_summary(f.get("summary")), parent)
+            issue = next(
+                (c for c in by_summary.get(sig, []) if c["key"] not in matched), None
+            )
+
+        if issue is None:
+            if change in ("delete", "update"):
+                # Änderung an einem Issue, das es in Jira nicht (mehr) gibt
+                skipped.append({"ref": ref, "reason": "not_in_jira"})
+                continue
+            fields = {
+                canon: _canon(canon, v) for canon, v in _plan_fields(item).items()
+            }
+            n = _lower_name(f.get("issuetype") or f.get("issue_type"))
+            creates.append(
+                {
+                    "ref": ref,
+                    "issue_type": n,
+                    "parent": parent,
+                    "fields": {k: v for k, v in fields.items() if v not in (None, [])},
+                }
+            )
+            continue
+
+        jira_key = issue["key"]
+        matched.add(jira_key)
+        resolved[ref] = jira_key
+
+        if change == "delete":
+            deletes.append({"ref": ref, "key": jira_key})
+            continue
+
+        current = _jira_fields(issue)
+        field_changes: Dict[str, Dict] = {}
+        for canon, v in _plan_fields(item).items():
+            before, after = _canon(canon, current.get(canon)), _canon(canon, v)
+            if canon == "summary" and normalize_summary(before) == normalize_summary(
+                after
+            ):
+                continue  # reine Schreibweise – kein Update
+            if before != after:
+                field_changes[canon] = {"from": before, "to": after}
+
+        moved = bool(parent_ref) and parent != (issue.get("parent_key") or None)
+        if moved:
+            moves.append(
+                {
+                    "ref": ref,
+                    "key": jira_key,
+                    "from": issue.get("parent_key"),
+                    "to": parent,
+                }
+            )
+        if field_changes:
+            updates.append({"ref": ref, "key": jira_key, "fields": field_changes})
+        if not field_changes and not moved:
+            unchanged += 1
+
+    changeset = {
+        "creates": creates,
+        "updates": updates,
+        "moves": moves,
+        "deletes": deletes,
+    }
+    changeset["hash"] = changeset_hash(changeset)
+    changeset["in_sync"] = not (creates or updates or moves or deletes)
+    changeset["skipped"] = skipped
+    changeset["unchanged"] = unchanged
+    return changeset
+
+
+# -------------------------------------------------
+# Tool
+# -------------------------------------------------
+@function_tool
+async def diff_plan_against_jira(wrapper: RunContextWrapper[UserContext]) -> str:
+    """
+    Vergleicht den geplanten Stand (captains.plan) deterministisch mit Jira und liefert
+    ein minimales Changeset als JSON:
+      {"creates","updates","moves","deletes","skipped","unchanged","in_sync","hash"}
+    - updates enthalten nur geänderte Felder ({"from","to"}).
+    - in_sync=true → Plan entspricht bereits Jira, keine Aktion nötig.
+    """
+    captain_id = getattr(wrapper.context, "captain_id", None)
+    if not captain_id:
+        return json.dumps({"error": "captain_id fehlt"}, ensure_ascii=False)
+
+    # Plan (Supabase) und Jira-Stand parallel laden
+    plan, issues = await asyncio.gather(
+        run_db(_fetch_plan, captain_id),
+        asyncio.to_thread(_fetch_project_issues, wrapper.context, True),
+    )
+    return json.dumps(diff_plan(plan, issues), ensure_ascii=False)
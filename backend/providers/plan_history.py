@@ -0,0 +1,155 @@
+# providers/plan_history.py
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from providers.supabase_client import supabase as sb
+
+HISTORY_TABLE = "captain_plan_history"
+# Alle N Versionen einen vollständigen Snapshot ablegen (begrenzt die Replay-Länge)
+SNAPSHOT_EVERY = int(os.getenv("PLAN_SNAPSHOT_EVERY", "20"))
+
+
+# -------------------------------------------------
+# Delta-Berechnung (Operation-Log über Item-Keys)
+# -------------------------------------------------
+def plan_hash(plan: List[Dict]) -> str:
+    """Inhalts-Hash eines Plans (kanonisches JSON) – identifiziert den Stand je Version."""
+    raw = json.dumps(plan, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _keyed(plan: List[Dict]) -> bool:
+    keys = [it.get("key") for it in plan]
+    return all(keys) and len(set(keys)) == len(keys)
+
+
+def apply_plan_ops(plan: List[Dict], ops: List[Dict]) -> List[Dict]:
+    """
+    Wendet ein Operation-Log auf eine Plan-Kopie an:
+      {"op":"del","key":K}                 → Item K entfernen
+      {"op":"put","key":K,"at":i,"item":{}} → Item K (neu/geändert/verschoben) an Position i
+    """
+    out = list(plan)
+    for op in ops:
+        key = op.get("key")
+        out = [it for it in out if it.get("key") != key]
+        if op.get("op") == "put":
+            out.insert(min(int(op.get("at", len(out))), len(out)), op["item"])
+    return out
+
+
+def compute_plan_ops(before: List[Dict], after: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Minimales Operation-Log, das `before` in `after` überführt.
+    None, wenn sich der Plan nicht über Keys adressieren lässt (→ Snapshot nötig).
+    """
+    if not _keyed(before) or not _keyed(after):
+        return None
+
+    after_keys = {it["key"] for it in after}
+    ops: List[Dict] = [
+        {"op": "del", "key": it["key"]} for it in before if it["key"] not in after_keys
+    ]
+    state = [it for it in before if it["key"] in after_keys]
+
+    # Ziel-Reihenfolge von vorne aufbauen; nur abweichende Positionen erzeugen ein put
+    for i, item in enumerate(after):
+        if i < len(state) and state[i] == item:
+            continue
+        op = {"op": "put", "key": item["key"], "at": i, "item": item}
+        state = apply_plan_ops(state, [op])
+        ops.append(op)
+    return ops
+
+
+# -------------------------------------------------
+# Persistenz
+# -------------------------------------------------
+def record_plan_version(captain_id: str, before: List[Dict], after: List[Dict]) -> int:
+    """
+    Legt eine neue Plan-Version an (Delta oder Snapshot) und gibt ihre Nummer zurück
+    bzw. die aktuelle, wenn sich gegenüber dem Kopf der Historie nichts geändert hat.
+    Ein Delta wird nur geschrieben, wenn `before` dem Kopf entspricht (Hash-Vergleich
+    in der RPC); andere Schreiber von captains.plan oder verlorene Versionen führen
+    so zu einem Snapshot statt zu einem Delta auf falscher Basis.
+    """
+    ops = compute_plan_ops(before, after)
+    if ops is not None and len(json.dumps(ops, ensure_ascii=False)) >= len(
+        json.dumps(after, ensure_ascii=False)
+    ):
+        ops = None  # Delta größer als der Plan selbst → direkt Snapshot
+
+    res = sb.rpc(
+        "captain_plan_history_append",
+        {
+            "p_captain_id": captain_id,
+            "p_plan": after,
+            "p_plan_hash": plan_hash(after),
+            "p_ops": ops,
+            "p_base": before,
+            "p_base_hash": plan_hash(before),
+            "p_snapshot_every": SNAPSHOT_EVERY,
+        },
+    ).execute()
+    return int(res.data)
+
+
+def list_plan_versions(captain_id: str, limit: int = 50) -> List[Dict]:
+    """Versionen absteigend (ohne Payload)."""
+    limit = max(1, min(int(limit or 50), 500))
+    res = (
+        sb.table(HISTORY_TABLE)
+        .select("version,kind,op_count,item_count,created_at")
+        .eq("captain_id", captain_id)
+        .order("version", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return res.data or []
+
+
+def get_plan_at_version(captain_id: str, version: int) -> Optional[List[Dict]]:
+    """
+    Rekonstruiert den Plan zu einer Version: letzter Snapshot <= version + folgende Deltas.
+    None, wenn die Version nicht existiert.
+    """
+    snap = (
+        sb.table(HISTORY_TABLE)
+        .select("version,payload,plan_hash")
+        .eq("captain_id", captain_id)
+        .eq("kind", "snapshot")
+        .lte("version", version)
+        .order("version", desc=True)
+        .limit(1)
+        .execute()
+    )
+    snap_rows = snap.data or []
+    if not snap_rows:
+        return None
+    base_version = int(snap_rows[0]["version"])
+    plan = [it for it in (snap_rows[0].get("payload") or []) if isinstance(it, dict)]
+    if base_version == version:
+        return plan
+
+    deltas = (
+        sb.table(HISTORY_TABLE)
+        .select("version,payload,plan_hash")
+        .eq("captain_id", captain_id)
+        .gt("version", base_version)
+        .lte("version", version)
+        .order("version", desc=False)
+        .execute()
+    )
+    rows = deltas.data or []
+    if not rows or int(rows[-1]["version"]) != version:
+        return None
+    for r in rows:
+        plan = apply_plan_ops(plan, r.get("payload") or [])
+    expected = rows[-1].get("plan_hash")
+    if expected and plan_hash(plan) != expected:
+        # Replay ergibt nicht den gespeicherten Stand → lieber nichts als einen falschen Plan
+        print(f"[plan_history] {captain_id} v{version}: Rekonstruktion inkonsistent")
+        return None
+    return plan
@@ -0,0 +1,221 @@
+# providers/supabase_client.py
+# Gemeinsamer Supabase-Zugang für Provider und Routes:
+# - `supabase`: EIN synchroner supabase-py Client pro Prozess (für die function_tools)
+# - Async PostgREST: gepoolter httpx.AsyncClient (Keep-Alive, Timeouts, Retries),
+#   wird beim App-Start geöffnet und beim Shutdown geschlossen.
+# - DB-Pool: begrenzter Thread-Pool, in dem die supabase-py Calls der Tools laufen,
+#   damit sie den Event-Loop (Streaming!) nicht blockieren.
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+from supabase import Client, create_client
+
+load_dotenv(override=True)
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.environ["SUPABASE_URL"]
+SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]  # Service Role (serverseitig!)
+
+# ---------- supabase-py (sync) ----------
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# ---------- DB-Pool für supabase-py ----------
+DB_WORKERS = int(os.getenv("SUPABASE_DB_WORKERS", "16"))
+_db_pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="supabase")
+
+T = TypeVar("T")
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Führt einen blockierenden DB-Call im begrenzten DB-Pool aus."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_pool, functools.partial(fn, *args, **kwargs))
+
+
+async def execute(query: Any) -> Any:
+    """`await execute(supabase.table(...)...)` statt `.execute()` im Event-Loop."""
+    return await run_db(query.execute)
+
+
+# ---------- PostgREST (async) ----------
+REST_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+REST_LIMITS = httpx.Limits(
+    max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+REST_MAX_RETRIES = 2
+RETRY_STATUS = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "PATCH", "DELETE"}
+
+_rest: Optional[httpx.AsyncClient] = None
+
+
+def _new_rest_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=f"{SUPABASE_URL}/rest/v1",
+        headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Accept": "application/json",
+        },
+        timeout=REST_TIMEOUT,
+        limits=REST_LIMITS,
+    )
+
+
+async def startup() -> None:
+    """Beim App-Start: gepoolten PostgREST-Client öffnen."""
+    global _rest
+    if _rest is None or _rest.is_closed:
+        _rest = _new_rest_client()
+
+
+async def shutdown() -> None:
+    """Beim App-Shutdown: Verbindungen sauber schließen."""
+    global _rest
+    if _rest is not None:
+        await _rest.aclose()
+        _rest = None
+
+
+def rest() -> httpx.AsyncClient:
+    """Gepoolter PostgREST-Client (lazy, falls startup() nicht lief – z. B. in Skripten)."""
+    global _rest
+    if _rest is None or _rest.is_closed:
+        _rest = _new_rest_client()
+    return _rest
+
+
+async def request(
+    method: str,
+    path: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    json: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    retry: Optional[bool] = None,
+) -> httpx.Response:
+    """
+    PostgREST-Request über den gemeinsamen Client. Wiederholt Transportfehler und
+    502/503/504 mit Backoff – standardmäßig nur für idempotente Methoden.
+    Wirft httpx.HTTPStatusError bei Nicht-2xx (wie raise_for_status()).
+    """
+    method = method.upper()
+    if retry is None:
+        retry = method in IDEMPOTENT_METHODS
+    attempts = 1 + (REST_MAX_RETRIES if retry else 0)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            resp = await rest().request(
+                method,
+                path,
+                params=params,
+                json=json,
+                headers=headers,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+        except httpx.TransportError as e:
+            if attempt >= attempts:
+                raise
+            logger.warning(
+                "postgrest %s %s transport error (%s) attempt=%d/%d",
+                method,
+                path,
+                type(e).__name__,
+                attempt,
+                attempts,
+            )
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt >= attempts:
+                resp.raise_for_status()
+                return resp
+            logger.warning(
+                "postgrest %s %s status=%s attempt=%d/%d",
+                method,
+                path,
+                resp.status_code,
+                attempt,
+                attempts,
+            )
+        await asyncio.sleep(0.2 * (2 ** (attempt - 1)))
+    raise RuntimeError("unreachable")
+
+
+# ---------- Typed Query Helpers ----------
+def eq(value: Any) -> str:
+    return f"eq.{value}"
+
+
+def in_(values: List[Any]) -> str:
+    return "in.(" + ",".join(str(v) for v in values) + ")"
+
+
+async def select(
+    table: str,
+    filters: Optional[Dict[str, str]] = None,
+    columns: str = "*",
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[Dict]:
+    """SELECT mit PostgREST-Filtern, z. B. filters={"user_id": eq(uid)}."""
+    params: Dict[str, Any] = {"select": columns, **(filters or {})}
+    if order:
+        params["order"] = order
+    if limit is not None:
+        params["limit"] = limit
+    resp = await request("GET", f"/{table}", params=params)
+    return resp.json() or []
+
+
+async def select_one(
+    table: str, filters: Dict[str, str], columns: str = "*"
+) -> Optional[Dict]:
+    rows = await select(table, filters, columns=columns, limit=1)
+    return rows[0] if rows else None
+
+
+async def update(
+    table: str, values: Dict[str, Any], filters: Dict[str, str]
+) -> List[Dict]:
+    """PATCH; gibt die aktualisierten Rows zurück (return=representation)."""
+    resp = await request(
+        "PATCH",
+        f"/{table}",
+        params=filters,
+        json=values,
+        headers={"Prefer": "return=representation"},
+    )
+    return resp.json() if resp.content else []
+
+
+async def upsert(
+    table: str,
+    rows: List[Dict[str, Any]],
+    on_conflict: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> List[Dict]:
+    """Bulk-Upsert (merge-duplicates); gibt die gespeicherten Rows zurück."""
+    resp = await request(
+        "POST",
+        f"/{table}",
+        params={"on_conflict": on_conflict} if on_conflict else None,
+        json=rows,
+        headers={"Prefer": "resolution=merge-duplicates,return=representation"},
+        timeout=timeout,
+        retry=True,  # merge-duplicates ist idempotent
+    )
+    return resp.json() if resp.content else []
+
+
+async def rpc(fn: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """Aufruf einer Postgres-Funktion über /rpc/<fn>."""
+    resp = await request("POST", f"/rpc/{fn}", json=params or {})
+    return resp.json() if resp.content else None
@@ -1,17 +1,11 @@
 # providers/supabase_providers.py
-import os
 from typing import Dict, List, Optional, Set, Tuple
 
 from agents import RunContextWrapper, function_tool
 from models import PlannerIssue, UserContext
-from supabase import Client, create_client
-
-# -------------------------------------------------
-# Supabase
-# -------------------------------------------------
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-sb: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from providers.plan_history import record_plan_version
+from providers.supabase_client import run_db
+from providers.supabase_client import supabase as sb
 
 
 # -------------------------------------------------
@@ -84,9 +78,19 @@ def _fetch_plan(captain_id: str) -> List[Dict]:
     return [it for it in plan if isinstance(it, dict)]
 
 
-def _save_plan(captain_id: str, plan: List[Dict]) -> None:
+def _save_plan(
+    captain_id: str, plan: List[Dict], previous: Optional[List[Dict]] = None
+) -> None:
+    """Speichert den Plan; mit `previous` wird die Änderung in der Plan-Historie abgelegt."""
     clean = [it for it in plan if isinstance(it, dict)]
     sb.table("captains").update({"plan": clean}).eq("id", captain_id).execute()
+    if previous is None:
+        return
+    try:
+        record_plan_version(captain_id, previous, clean)
+    except Exception as e:
+        # Historie ist best effort – der Plan selbst ist bereits gespeichert
+        print(f"[plan_history] Version konnte nicht gespeichert werden: {e}")
 
 
 def _next_key(prefix: str, existing: set[str]) -> str:
@@ -329,7 +333,7 @@ def _collect_epic_descendants(plan: List[Dict], epic_key: str) -> Set[str]:
 # 1) Plan als STRING (hierarchisch) zurückgeben
 # -------------------------------------------------
 @function_tool
-def get_plan_for_context(wrapper: RunContextWrapper[UserContext]) -> str:
+async def get_plan_for_context(wrapper: RunContextWrapper[UserContext]) -> str:
     """
     Gibt den Plan als Text zurück – hierarchisch:
     E001 | epic | Implementierung ...
@@ -340,7 +344,7 @@ def get_plan_for_context(wrapper: RunContextWrapper[UserContext]) -> str:
     if not captain_id:
         return "Kein Captain konfiguriert."
 
-    plan = _fetch_plan(captain_id)
+    plan = await run_db(_fetch_plan, captain_id)
     if not plan:
         return "Plan ist leer."
 
@@ -372,7 +376,7 @@ def get_plan_for_context(wrapper: RunContextWrapper[UserContext]) -> str:
 # 2) Ein Issue anhängen/ersetzen – mit gezielter Positionierung
 # -------------------------------------------------
 @function_tool
-def append_or_replace_plan_item(
+async def append_or_replace_plan_item(
     wrapper: RunContextWrapper[UserContext], item: PlannerIssue
 ) -> str:
     captain_id = getattr(wrapper.context, "captain_id", None)
@@ -392,7 +396,8 @@ def append_or_replace_plan_item(
     if change not in {"create", "update"}:
         change = "create"
 
-    plan = _fetch_plan(captain_id)
+    plan = await run_db(_fetch_plan, captain_id)
+    previous = list(plan)
     existing_keys = {
         it.get("key") for it in plan if isinstance(it, dict) and it.get("key")
     }
@@ -491,13 +496,13 @@ def append_or_replace_plan_item(
         insert_at = _insertion_index(plan, raw)
         plan.insert(insert_at, raw)
 
-    _save_plan(captain_id, plan)
+    await run_db(_save_plan, captain_id, plan, previous)
     return f"✅ {key} {'ersetzt' if replaced else 'hinzugefügt'} ({n or 'unknown'})."
 
 
 # ---------- UPDATE: Felder eines Items ändern ----------
 @function_tool
-def update_plan_item_fields(
+async def update_plan_item_fields(
     wrapper: RunContextWrapper[UserContext],
     key: str,
     summary: Optional[str] = None,
@@ -520,7 +525,8 @@ def update_plan_item_fields(
     if not isinstance(key, str) or not key.strip():
         return "❌ Ungültiger Key."
 
-    plan = _fetch_plan(captain_id)
+    plan = await run_db(_fetch_plan, captain_id)
+    previous = list(plan)
 
     # Zielobjekt vorbereiten
     new_fields: Dict = {}
@@ -590,13 +596,13 @@ def update_plan_item_fields(
     if not replaced:
         plan.append(new_item)
 
-    _save_plan(captain_id, plan)
+    await run_db(_save_plan, captain_id, plan, previous)
     return f"✅ {key} {'ersetzt' if replaced else 'hinzugefügt'} (update)."
 
 
 # ---------- DELETE: Item entfernen (optional mit Cascade) ----------
 @function_tool
-def delete_plan_item(
+async def delete_plan_item(
     wrapper: RunContextWrapper[UserContext],
     key: str,
     cascade: bool = False,
@@ -617,7 +623,7 @@ def delete_plan_item(
     if not isinstance(key, str) or not key.strip():
         return "❌ Ungültiger Key."
 
-    plan = _fetch_plan(captain_id)
+    plan = await run_db(_fetch_plan, captain_id)
     item = _find_item_by_key(plan, key.strip())
     if not item:
         return f"❌ Key {key} nicht im Plan gefunden."
@@ -652,7 +658,7 @@ def delete_plan_item(
             to_del = {key}
 
     new_plan = [it for it in plan if it.get("key") not in to_del]
-    _save_plan(captain_id, new_plan)
+    await run_db(_save_plan, captain_id, new_plan, plan)
     if len(to_del) == 1:
         return f"✅ {key} gelöscht."
     return f"✅ {len(to_del)} Elemente gelöscht ({', '.join(sorted(to_del))})."
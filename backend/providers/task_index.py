@@ -0,0 +1,124 @@
+# providers/task_index.py
+# Deterministischer Ähnlichkeitsindex für Tasks je Captain + Issue:
+# normalisierte Titel → Zeichen-Trigramme → Jaccard. Fängt Beinahe-Duplikate ab,
+# die der Unique-Key (captain_id, issue_key, title) nicht erkennt.
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from providers.supabase_client import execute, supabase
+
+# Ab dieser Jaccard-Ähnlichkeit gilt ein Titel als Duplikat
+TASK_DUP_THRESHOLD = float(os.getenv("TASK_DUP_THRESHOLD", "0.6"))
+SHINGLE_SIZE = 3
+# Nur offene Tasks zählen als Duplikat (erledigte/abgebrochene dürfen wiederkommen)
+OPEN_STATUSES = ("pending_approval", "in_progress")
+
+_STOPWORDS = {
+    # de
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einen", "und", "oder",
+    "für", "fuer", "mit", "von", "zu", "zum", "zur", "im", "in", "am", "an", "auf",
+    # en
+    "the", "a", "an", "and", "or", "for", "with", "of", "to", "in", "on",
+}  # fmt: skip
+
+
+def normalize_title(title: str) -> str:
+    s = unicodedata.normalize("NFKC", str(title or "")).casefold()
+    s = re.sub(r"[^\w\s]", " ", s)
+    words = [w for w in s.split() if w not in _STOPWORDS]
+    return " ".join(words)
+
+
+def numbers(title: str) -> Tuple[str, ...]:
+    """Zahlen-Tokens eines Titels ("Deploy v1.2" → ("1.2",)); abweichende Zahlen = andere Task."""
+    s = unicodedata.normalize("NFKC", str(title or ""))
+    return tuple(sorted(re.findall(r"\d+(?:[.,]\d+)*", s)))
+
+
+def shingles(title: str) -> Set[str]:
+    s = normalize_title(title)
+    if len(s) <= SHINGLE_SIZE:
+        return {s} if s else set()
+    padded = f" {s} "
+    return {padded[i : i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class TaskIndex:
+    """Titel-Shingles je Issue; similar() liefert den ähnlichsten Eintrag."""
+
+    def __init__(self, threshold: float = TASK_DUP_THRESHOLD):
+        self.threshold = threshold
+        self._by_issue: Dict[
+            str, List[Tuple[Optional[str], str, Set[str], Tuple[str, ...]]]
+        ] = {}
+
+    def add(self, issue_key: str, title: str, task_id: Optional[str] = None) -> None:
+        self._by_issue.setdefault(issue_key, []).append(
+            (task_id, title, shingles(title), numbers(title))
+        )
+
+    def similar(
+        self, issue_key: str, title: str
+    ) -> Optional[Tuple[Optional[str], str, float]]:
+        """(task_id, title, score) des ähnlichsten Titels ≥ threshold, sonst None."""
+        sh, nums = shingles(title), numbers(title)
+        best = None
+        for task_id, other, other_sh, other_nums in self._by_issue.get(issue_key, []):
+            if nums != other_nums:
+                continue  # "v1.2" vs. "v1.3", "PR #12" vs. "PR #13"
+            score = jaccard(sh, other_sh)
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (task_id, other, score)
+        return best
+
+
+async def load_task_index(
+    captain_id: str, issue_keys: Optional[Iterable[str]] = None
+) -> TaskIndex:
+    """Index über die offenen Tasks eines Captains (optional nur bestimmte Issues)."""
+    index = TaskIndex()
+    q = (
+        supabase.table("tasks")
+        .select("id,issue_key,title")
+        .eq("captain_id", captain_id)
+        .in_("status", list(OPEN_STATUSES))
+    )
+    keys = sorted(set(issue_keys or []))
+    if issue_keys is not None:
+        if not keys:
+            return index
+        q = q.in_("issue_key", keys)
+    res = await execute(q)
+    for r in res.data or []:
+        index.add(r.get("issue_key") or "", r.get("title") or "", str(r.get("id")))
+    return index
+
+
+def dedup_suggestions(
+    index: TaskIndex, suggestions: List[Dict]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Filtert Vorschläge, die einer bestehenden Task (oder einem bereits behaltenen
+    Vorschlag) desselben Issues zu ähnlich sind. Rückgabe: (behalten, verworfen).
+    Verworfene enthalten duplicate_of (Task-ID oder None) und similarity.
+    """
+    kept, dropped = [], []
+    for s in suggestions:
+        issue_key, title = s.get("issue_key") or "", s.get("title") or ""
+        hit = index.similar(issue_key, title)
+        if hit:
+            dropped.append(
+                {**s, "duplicate_of": hit[0], "similarity": round(hit[2], 3)}
+            )
+            continue
+        index.add(issue_key, title)
+        kept.append(s)
+    return kept, dropped
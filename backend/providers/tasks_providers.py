@@ -1,92 +1,95 @@
 import os
+import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from agents import RunContextWrapper, function_tool
-from models import EventLite, ExistingTaskLite, IssueContext, TaskRow
-from supabase import Client, create_client
-
-# Supabase init
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from models import EventLite, ExistingTaskLite, IssueContext, TaskRow, TaskRowPatch
+from providers.supabase_client import execute, supabase
 
 # Config
 BODY_MAX_CHARS = 800
-SINCE_ISO = (datetime.utcnow() - timedelta(days=30)).isoformat() + "Z"
+# Standard-Zeitfenster für Events (pro Request über UserContext.window_hours änderbar)
+DEFAULT_WINDOW_HOURS = float(os.getenv("TASKS_WINDOW_HOURS", str(30 * 24)))
+MAX_WINDOW_HOURS = 365 * 24
 MAX_EVENTS_PER_ISSUE = 50
+ISSUES_PAGE_SIZE = 100
+MAX_ISSUES = 1000
 MAX_EXISTING_TASKS = 500
+MAX_TASKS_PER_ISSUE = 15
+# Obergrenze für tasks.description/plan beim Anhängen (älteste Teile fallen weg; 0 = aus)
+TASK_TEXT_MAX_CHARS = int(os.getenv("TASK_TEXT_MAX_CHARS", "4000"))
+
+
+def since_iso(window_hours: Optional[float] = None) -> str:
+    """Beginn des Event-Zeitfensters, zum Aufrufzeitpunkt berechnet."""
+    hours = DEFAULT_WINDOW_HOURS if window_hours is None else window_hours
+    return (datetime.utcnow() - timedelta(hours=hours)).isoformat() + "Z"
+
+
+async def load_issue_contexts(
+    captain_id: str,
+    issue_keys: Optional[List[str]] = None,
+    window_hours: Optional[float] = None,
+) -> List[IssueContext]:
+    """
+    Issue-Kontexte eines Captains über die RPC dccts_issue_contexts: Gruppierung,
+    Top-N-Events je Issue und Body-Kürzung passieren in Postgres; Issues werden per
+    Keyset-Pagination (last_ts, issue_key) seitenweise geladen, neueste zuerst.
+    issue_keys: optional nur diese Issues (None = alle).
+    window_hours: Event-Zeitfenster (None = DEFAULT_WINDOW_HOURS).
+    """
+    since = since_iso(window_hours)
+    issues: List[IssueContext] = []
+    after_ts: Optional[str] = None
+    after_key: Optional[str] = None
+    while len(issues) < MAX_ISSUES:
+        res = await execute(
+            supabase.rpc(
+                "dccts_issue_contexts",
+                {
+                    "p_captain_id": captain_id,
+                    "p_since": since,
+                    "p_per_issue": MAX_EVENTS_PER_ISSUE,
+                    "p_body_chars": BODY_MAX_CHARS,
+                    "p_limit": ISSUES_PAGE_SIZE,
+                    "p_after_ts": after_ts,
+                    "p_after_key": after_key,
+                    "p_issue_keys": issue_keys,
+                },
+            )
+        )
+        rows = res.data or []
+        for r in rows:
+            issues.append(
+                IssueContext(
+                    issue_key=r["issue_key"],
+                    web_url=r.get("web_url"),
+                    events=[EventLite(**e) for e in (r.get("events") or [])],
+                )
+            )
+        if len(rows) < ISSUES_PAGE_SIZE:
+            break
+        after_ts, after_key = rows[-1]["last_ts"], rows[-1]["issue_key"]
+    return issues[:MAX_ISSUES]
 
 
 @function_tool
-def get_issues_context(wrapper: RunContextWrapper) -> List[IssueContext]:
+async def get_issues_context(wrapper: RunContextWrapper) -> List[IssueContext]:
     """Gibt eine Liste aller Events eines Captains gruppiert nach Issues aus."""
 
     captain_id = wrapper.context.captain_id
     if not captain_id:
         raise ValueError("No captain_id provided in UserContext.")
-
-    sel = ",".join(
-        [
-            "event_id",
-            "event_type",
-            "object_key",
-            "ts",
-            "actor_display:ues->actor->>display",
-            "artefact_title:ues->artefact->>title",
-            "artefact_body:ues->artefact->>body",
-            "jira_web_url:ues->refs->jira->>web_url",
-        ]
-    )
-
-    q = (
-        supabase.table("dccts_events")
-        .select(sel)
-        .eq("captain_id", captain_id)
-        .gte("ts", SINCE_ISO)
-        .order("ts", desc=False)
+    return await load_issue_contexts(
+        str(captain_id),
+        getattr(wrapper.context, "issue_keys", None),
+        getattr(wrapper.context, "window_hours", None),
     )
-    rows = q.execute().data or []
-
-    groups: Dict[str, Dict[str, Any]] = {}
-
-    def _cut(s: Optional[str]) -> Optional[str]:
-        if not s:
-            return s
-        return s if len(s) <= BODY_MAX_CHARS else (s[:BODY_MAX_CHARS] + " …")
-
-    for r in rows:
-        issue_key = r.get("object_key") or "unknown"
-        if issue_key not in groups:
-            groups[issue_key] = {
-                "issue_key": issue_key,
-                "web_url": r.get("jira_web_url"),
-                "events": [],
-            }
-
-        ev = EventLite(
-            event_id=r.get("event_id"),
-            t=(r.get("ts") or datetime.utcnow().isoformat() + "Z"),
-            type=r.get("event_type"),
-            actor=r.get("actor_display"),
-            title=r.get("artefact_title"),
-            body=_cut(r.get("artefact_body")),
-        )
-        groups[issue_key]["events"].append(ev)
-
-    issues: List[IssueContext] = []
-    for g in groups.values():
-        evs = sorted(g["events"], key=lambda e: e.t or "")[-MAX_EVENTS_PER_ISSUE:]
-        issues.append(
-            IssueContext(issue_key=g["issue_key"], web_url=g["web_url"], events=evs)
-        )
-
-    issues.sort(key=lambda ic: (ic.events[-1].t if ic.events else ""), reverse=True)
-    return issues
 
 
 @function_tool
-def get_captain_tasks(wrapper: RunContextWrapper) -> List[ExistingTaskLite]:
+async def get_captain_tasks(wrapper: RunContextWrapper) -> List[ExistingTaskLite]:
     """Gibt die dedupe-relevanten Tasks eines Captains aus (alle Stati)."""
     captain_id = getattr(getattr(wrapper, "context", None), "captain_id", None)
     if not captain_id:
@@ -104,18 +107,28 @@ def get_captain_tasks(wrapper: RunContextWrapper) -> List[ExistingTaskLite]:
 
     sel = "id,issue_key,title,description,plan,status,priority,created_at,updated_at"
 
-    rows = (
+    q = (
         supabase.table("tasks")
         .select(sel)
         .eq("captain_id", captain_id)
-        .order(
-            "updated_at", desc=False
-        )  # älteste → neueste; für ts_ref nimm einfach max()
+        .order("updated_at", desc=True)
         .limit(MAX_EXISTING_TASKS)  # hartes Limit gegen Token-Bloat
-        .execute()
-        .data
-        or []
     )
+    # Nur Tasks der Issues, die der Agent in diesem Lauf sieht
+    issue_keys = getattr(wrapper.context, "issue_keys", None)
+    if issue_keys:
+        q = q.in_("issue_key", issue_keys)
+    res = await execute(q)
+
+    # Je Issue nur die jüngsten MAX_TASKS_PER_ISSUE; Ausgabe älteste → neueste
+    per_issue: Dict[str, int] = {}
+    rows = []
+    for r in res.data or []:
+        k = r.get("issue_key") or ""
+        per_issue[k] = per_issue.get(k, 0) + 1
+        if per_issue[k] <= MAX_TASKS_PER_ISSUE:
+            rows.append(r)
+    rows.reverse()
 
     out: List[ExistingTaskLite] = []
     for r in rows:
@@ -139,71 +152,107 @@ def get_captain_tasks(wrapper: RunContextWrapper) -> List[ExistingTaskLite]:
 
 
 @function_tool
-def update_task(wrapper: RunContextWrapper, task_row: TaskRow) -> TaskRow:
+async def update_task(wrapper: RunContextWrapper, task_row: TaskRow) -> TaskRow:
     """Updated eine bestehende Task"""
     captain_id = getattr(getattr(wrapper, "context", None), "captain_id", None)
     if not captain_id:
         raise ValueError("No captain_id provided in UserContext.")
-    task_id = task_row.id
-    if not task_id:
+    if not task_row.id:
         raise ValueError("task_row.id is required.")
 
-    sel = "id,captain_id,issue_key,title,reason,description,priority,plan,status,created_at,updated_at"
-    res = (
-        supabase.table("tasks")
-        .select(sel)
-        .eq("id", task_id)
-        .eq("captain_id", captain_id)
-        .limit(1)
-        .execute()
+    # description/plan werden standardmäßig serverseitig angehängt (atomar, ohne Re-Read)
+    patch = TaskRowPatch(
+        id=task_row.id,
+        issue_key=task_row.issue_key,
+        title=task_row.title,
+        reason=task_row.reason,
+        priority=task_row.priority,
+        status=task_row.status,
+        description=task_row.description,
+        description_mode=getattr(task_row, "description_mode", "append"),
+        plan=task_row.plan,
+        plan_mode=getattr(task_row, "plan_mode", "append"),
     )
-    rows = res.data or []
+    rows = await _update_tasks(str(captain_id), [patch])
     if not rows:
         raise ValueError("Task not found for this captain_id.")
-    current = rows[0]
-
-    patch: Dict[str, Any] = {}
-    for field in ["issue_key", "title", "reason", "priority", "status"]:
-        val = getattr(task_row, field, None)
-        if val is not None:
-            patch[field] = val
-
-    # ---- NEU: sichere Default-Append-Logik ----
-    desc_mode = getattr(task_row, "description_mode", "append")  # 'append' | 'replace'
-    plan_mode = getattr(task_row, "plan_mode", "append")  # 'append' | 'replace'
-
-    if getattr(task_row, "description", None) is not None:
-        if desc_mode == "append":
-            old = current.get("description") or ""
-            sep = "\n\n" if old and not old.endswith("\n") else ""
-            patch["description"] = (old + sep + task_row.description).strip()
-        else:
-            patch["description"] = task_row.description
-
-    if getattr(task_row, "plan", None) is not None:
-        if plan_mode == "append":
-            oldp = current.get("plan") or ""
-            sep = "\n" if oldp and not oldp.endswith("\n") else ""
-            patch["plan"] = (oldp + sep + task_row.plan).strip()
-        else:
-            patch["plan"] = task_row.plan
-    # -------------------------------------------
-
-    if not patch:
-        return TaskRow(**current)
-
-    supabase.table("tasks").update(patch).eq("id", task_id).eq(
-        "captain_id", captain_id
-    ).execute()
-    res2 = (
-        supabase.table("tasks")
-        .select(sel)
-        .eq("id", task_id)
-        .eq("captain_id", captain_id)
-        .limit(1)
-        .execute()
+    return rows[0]
+
+
+# Feld → Trenner beim Anhängen (wie tasks_append_text in der RPC)
+_APPEND_SEPARATORS = {"description": "\n\n", "plan": "\n"}
+
+
+def _join_text(old: str, new: str, sep: str) -> str:
+    if not old:
+        return new
+    return old + new if old.endswith("\n") else old + sep + new
+
+
+def _merge_patches(patches: List[TaskRowPatch]) -> List[Dict[str, Any]]:
+    """
+    Mehrere Patches derselben Task zu einem zusammenfassen (Reihenfolge bleibt):
+    Felder → letzter Wert gewinnt; description/plan-Appends werden aneinandergehängt,
+    ein späteres 'replace' ersetzt alles davor. Ungültige IDs werden verworfen.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for p in patches:
+        try:
+            task_id = str(uuid.UUID(str(p.id)))
+        except ValueError:
+            print(f"[tasks] update ignored: invalid task id {p.id!r}")
+            continue
+        data = p.model_dump(exclude_none=True)
+        m = merged.setdefault(task_id, {"id": task_id})
+        for field, sep in _APPEND_SEPARATORS.items():
+            text, mode = data.pop(field, None), data.pop(f"{field}_mode", "append")
+            if text is None:
+                continue
+            if mode == "append" and m.get(field) is not None:
+                m[field] = _join_text(m[field], text, sep)
+            else:
+                m[field], m[f"{field}_mode"] = text, mode
+        data.pop("id", None)
+        m.update(data)
+    return list(merged.values())
+
+
+async def _update_tasks(captain_id: str, patches: List[TaskRowPatch]) -> List[TaskRow]:
+    """Wendet viele Patches in einem Statement an (RPC tasks_bulk_update)."""
+    payload = _merge_patches(patches)
+    if not payload:
+        return []
+    res = await execute(
+        supabase.rpc(
+            "tasks_bulk_update",
+            {
+                "p_captain_id": captain_id,
+                "p_patches": payload,
+                "p_max_len": TASK_TEXT_MAX_CHARS,
+            },
+        )
     )
-    rows2 = res2.data or []
-    if not rows2:
-        raise RuntimeError("Updated task could not be fetched.")
-    return TaskRow(**rows2[0])
+    out: List[TaskRow] = []
+    for r in res.data or []:
+        try:
+            out.append(TaskRow(**{**r, "id": str(r.get("id"))}))
+        except Exception:
+            continue
+    return out
+
+
+@function_tool
+async def update_tasks(
+    wrapper: RunContextWrapper, patches: List[TaskRowPatch]
+) -> List[TaskRow]:
+    """
+    Updated mehrere bestehende Tasks in einem Aufruf (statt update_task je Task).
+    Nur gesetzte Felder werden geändert; description/plan werden standardmäßig
+    angehängt (mode 'append'), mit 'replace' ersetzt. Mehrere Patches für dieselbe
+    Task werden in Reihenfolge zusammengeführt (z. B. Status + Append). Patches mit
+    ungültiger ID werden ignoriert. Gibt die geänderten Tasks zurück.
+    """
+    captain_id = getattr(getattr(wrapper, "context", None), "captain_id", None)
+    if not captain_id:
+        raise ValueError("No captain_id provided in UserContext.")
+    return await _update_tasks(str(captain_id), patches)
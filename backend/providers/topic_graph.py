@@ -0,0 +1,185 @@
+# providers/topic_graph.py
+# Topic-Graph je Scope (Knoten = dccts_topics, Kanten = dccts_topic_relations) als
+# In-Process-Adjazenz-Cache: einmal laden (2 Queries), danach inkrementell über
+# link_topics/create_topic aktualisieren; TTL holt Schreibzugriffe anderer Prozesse nach.
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from providers.supabase_client import execute, supabase
+
+GRAPH_TTL_SECONDS = float(os.getenv("TOPIC_GRAPH_TTL_SECONDS", "300"))
+MAX_HOPS = 4
+PAGE_SIZE = 1000  # = PostgREST max-rows
+
+Edge = Tuple[str, str, str]  # (topic_id, related_topic_id, relation_type)
+
+
+def scope_of(topic_id: str) -> Optional[str]:
+    """Scope aus '<scope>:topic:<slug>-<hash6>' (None bei Topics ohne Scope)."""
+    scope, sep, _ = (topic_id or "").rpartition(":topic:")
+    return scope if sep and scope else None
+
+
+class ScopeGraph:
+    def __init__(self, scope: str, nodes: Dict[str, Dict], edges: Iterable[Edge]):
+        self.scope = scope
+        self.nodes = nodes
+        self.edges: Set[Edge] = set()
+        self.adj: Dict[str, Set[Edge]] = {}
+        self.loaded_at = time.monotonic()
+        self._etag: Optional[str] = None
+        for e in edges:
+            self.add_edge(e)
+
+    def add_node(self, topic: Dict) -> None:
+        tid = topic["topic_id"]
+        node = self.nodes.setdefault(tid, {"topic_id": tid})
+        for k in ("title", "labels", "status"):
+            if topic.get(k) is not None:
+                node[k] = topic[k]
+        self._etag = None
+
+    def add_edge(self, edge: Edge) -> None:
+        if edge in self.edges:
+            return
+        self.edges.add(edge)
+        src, dst, _ = edge
+        self.adj.setdefault(src, set()).add(edge)
+        self.adj.setdefault(dst, set()).add(edge)
+        self._etag = None
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.loaded_at > GRAPH_TTL_SECONDS
+
+    def etag(self) -> str:
+        """Inhaltsbasiertes ETag (stabil über Prozesse/Reloads hinweg)."""
+        if self._etag is None:
+            raw = json.dumps(
+                [sorted(self.nodes.items()), sorted(self.edges)],
+                sort_keys=True,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            self._etag = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+        return self._etag
+
+    def neighbourhood(
+        self,
+        root: str,
+        hops: int = 1,
+        relation_types: Optional[Set[str]] = None,
+    ) -> Tuple[List[str], List[Edge]]:
+        """k-Hop-Nachbarschaft (richtungsunabhängig, BFS) ab root."""
+        hops = max(0, min(int(hops), MAX_HOPS))
+        seen = {root}
+        edges: Set[Edge] = set()
+        frontier = deque([(root, 0)])
+        while frontier:
+            tid, depth = frontier.popleft()
+            if depth >= hops:
+                continue
+            for e in self.adj.get(tid, ()):
+                if relation_types and e[2] not in relation_types:
+                    continue
+                edges.add(e)
+                other = e[1] if e[0] == tid else e[0]
+                if other not in seen:
+                    seen.add(other)
+                    frontier.append((other, depth + 1))
+        return sorted(seen), sorted(edges)
+
+
+_graphs: Dict[str, ScopeGraph] = {}
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _like_escape(value: str) -> str:
+    """LIKE-Metazeichen maskieren (Scope wird als Präfix-Literal verwendet)."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def _select_all(query_fn, order: Tuple[str, ...]) -> List[Dict]:
+    """Alle Zeilen seitenweise laden (PostgREST kappt Antworten bei max-rows)."""
+    rows: List[Dict] = []
+    start = 0
+    while True:
+        q = query_fn()
+        for col in order:
+            q = q.order(col)
+        res = await execute(q.range(start, start + PAGE_SIZE - 1))
+        page = res.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+async def _load(scope: str) -> ScopeGraph:
+    prefix = _like_escape(f"{scope}:topic:") + "%"
+    topics, relations = await asyncio.gather(
+        _select_all(
+            lambda: supabase.table("dccts_topics")
+            .select("topic_id,title,labels,status")
+            .eq("scope", scope),
+            ("topic_id",),
+        ),
+        _select_all(
+            lambda: supabase.table("dccts_topic_relations")
+            .select("topic_id,related_topic_id,relation_type")
+            .like("topic_id", prefix),
+            ("topic_id", "related_topic_id", "relation_type"),
+        ),
+    )
+    nodes = {t["topic_id"]: t for t in topics}
+    edges = [
+        (r["topic_id"], r["related_topic_id"], r.get("relation_type") or "related")
+        for r in relations
+        # PostgREST wertet '*' im like-Muster immer als Wildcard → exakt nachprüfen
+        if scope_of(r["topic_id"]) == scope
+    ]
+    return ScopeGraph(scope, nodes, edges)
+
+
+async def get_graph(scope: str, refresh: bool = False) -> ScopeGraph:
+    """Graph eines Scopes aus dem Cache (lädt bei Bedarf bzw. nach Ablauf der TTL)."""
+    g = _graphs.get(scope)
+    if g is not None and not refresh and not g.expired():
+        return g
+    lock = _locks.setdefault(scope, asyncio.Lock())
+    async with lock:
+        g = _graphs.get(scope)
+        if g is None or refresh or g.expired():
+            g = await _load(scope)
+            _graphs[scope] = g
+    return g
+
+
+def note_topic(topic: Dict) -> None:
+    """Neues/geändertes Topic in einen bereits geladenen Graph übernehmen."""
+    g = _graphs.get(topic.get("scope") or scope_of(topic.get("topic_id")))
+    if g is not None:
+        g.add_node(topic)
+
+
+def note_relation(topic_id: str, related_topic_id: str, relation_type: str) -> None:
+    """Upsert in dccts_topic_relations im Cache nachziehen (ohne Reload)."""
+    g = _graphs.get(scope_of(topic_id))
+    if g is not None:
+        g.add_node({"topic_id": topic_id})
+        g.add_node({"topic_id": related_topic_id})
+        g.add_edge((topic_id, related_topic_id, relation_type))
+
+
+def graph_payload(
+    g: ScopeGraph, topic_ids: Iterable[str], edges: Iterable[Edge]
+) -> Dict:
+    nodes = [g.nodes.get(tid, {"topic_id": tid}) for tid in topic_ids]
+    return {
+        "nodes": nodes,
+        "edges": [{"source": s, "target": t, "type": rt} for s, t, rt in edges],
+    }
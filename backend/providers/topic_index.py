@@ -0,0 +1,190 @@
+# providers/topic_index.py
+# Semantischer Topic-Index: Embeddings über title/description/summary in
+# dccts_topics.embedding (pgvector), Top-k-Suche per RPC match_dccts_topics.
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from agents import function_tool
+from openai import AsyncOpenAI
+from providers.supabase_client import execute, supabase
+
+EMBEDDING_MODEL = os.getenv("TOPIC_EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMS = 1536  # muss zur Spalte dccts_topics.embedding passen
+EMBED_TEXT_MAX_CHARS = 2000
+# LRU-Cache für Event-Texte (gleiche Texte → kein erneuter Embedding-Call)
+EMBED_CACHE_SIZE = int(os.getenv("TOPIC_EMBED_CACHE_SIZE", "2048"))
+# Backfill von Topics ohne Embedding im Hintergrund (0 = aus); nicht auf dem Suchpfad
+BACKFILL_INTERVAL_SECONDS = float(os.getenv("TOPIC_BACKFILL_INTERVAL_SECONDS", "300"))
+BACKFILL_LIMIT = 100
+BACKFILL_MAX_BATCHES = 20
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[AsyncOpenAI] = None
+_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_backfill_cursor: Optional[str] = None  # letzte topic_id des Backfills (Keyset)
+
+
+def _openai() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI()
+    return _client
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(f"{EMBEDDING_MODEL}\n{text}".encode("utf-8")).hexdigest()
+
+
+def topic_text(topic: Dict) -> str:
+    """Text, der für ein Topic eingebettet wird."""
+    parts = [topic.get("title"), topic.get("description"), topic.get("summary")]
+    return "\n".join(p.strip() for p in parts if p and p.strip())[:EMBED_TEXT_MAX_CHARS]
+
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embeddings für mehrere Texte; Cache-Treffer werden nicht erneut angefragt."""
+    keys = [_text_hash(t) for t in texts]
+    # Treffer vor dem Einfügen der Misses einsammeln – das Einfügen kann sie verdrängen
+    found: Dict[str, List[float]] = {}
+    for k in keys:
+        if k in _cache and k not in found:
+            _cache.move_to_end(k)
+            found[k] = _cache[k]
+    missing = list(dict.fromkeys(k for k in keys if k not in found))
+    if missing:
+        by_key = {k: t for k, t in zip(keys, texts)}
+        resp = await _openai().embeddings.create(
+            model=EMBEDDING_MODEL, input=[by_key[k] for k in missing]
+        )
+        for k, item in zip(missing, resp.data):
+            found[k] = item.embedding
+            _cache[k] = item.embedding
+            if len(_cache) > EMBED_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return [found[k] for k in keys]
+
+
+async def index_topics(topics: List[Dict], force: bool = False) -> int:
+    """
+    Aktualisiert die Embeddings der übergebenen Topics (benötigt topic_id + Textfelder).
+    Unveränderte Texte (gleicher embedding_hash) werden übersprungen, außer mit force
+    (Backfill: embedding fehlt trotz passendem Hash). Gibt die Anzahl neu eingebetteter
+    Topics zurück.
+    """
+    todo = []
+    for t in topics:
+        text = topic_text(t)
+        h = _text_hash(text)
+        if text and t.get("topic_id") and (force or t.get("embedding_hash") != h):
+            todo.append((t["topic_id"], text, h))
+    if not todo:
+        return 0
+
+    vectors = await embed_texts([text for _, text, _ in todo])
+    for (topic_id, _, h), vec in zip(todo, vectors):
+        await execute(
+            supabase.table("dccts_topics")
+            .update({"embedding": vec, "embedding_hash": h})
+            .eq("topic_id", topic_id)
+        )
+    return len(todo)
+
+
+async def index_topics_safe(topics: List[Dict]) -> None:
+    """Best-effort-Indizierung beim Anlegen/Ändern von Topics (blockiert nie den Schreibpfad)."""
+    try:
+        await index_topics(topics)
+    except Exception as e:
+        print(f"⚠️ Topic-Embedding fehlgeschlagen: {e}")
+
+
+async def backfill_embeddings() -> int:
+    """
+    Indiziert Topics ohne Embedding (batchweise, begrenzt je Lauf). Keyset-Pagination
+    über topic_id mit Cursor über Läufe hinweg: Topics ohne Text (werden nie
+    eingebettet) blockieren so nicht die dahinter liegenden.
+    """
+    global _backfill_cursor
+    total = 0
+    for _ in range(BACKFILL_MAX_BATCHES):
+        q = (
+            supabase.table("dccts_topics")
+            .select("topic_id,title,description,summary")
+            .is_("embedding", "null")
+            .order("topic_id")
+            .limit(BACKFILL_LIMIT)
+        )
+        if _backfill_cursor:
+            q = q.gt("topic_id", _backfill_cursor)
+        res = await execute(q)
+        rows = res.data or []
+        if rows:
+            total += await index_topics(rows, force=True)
+        if len(rows) < BACKFILL_LIMIT:
+            _backfill_cursor = None  # Ende erreicht → nächster Lauf beginnt vorn
+            break
+        _backfill_cursor = rows[-1]["topic_id"]
+    return total
+
+
+async def backfill_loop() -> None:
+    """Hintergrund-Loop (läuft im App-Lifespan, wenn BACKFILL_INTERVAL_SECONDS > 0)."""
+    while True:
+        try:
+            n = await backfill_embeddings()
+            if n:
+                logger.info("[topic_index] backfilled %d embeddings", n)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[topic_index] backfill failed")
+        await asyncio.sleep(BACKFILL_INTERVAL_SECONDS)
+
+
+async def match_topics_for_text(
+    text: str,
+    scope: Optional[str] = None,
+    k: int = 8,
+    min_similarity: float = 0.0,
+) -> List[Dict]:
+    """Top-k ähnlichste Topics (Cosine-Similarity) zu einem Text, absteigend."""
+    text = (text or "").strip()[:EMBED_TEXT_MAX_CHARS]
+    if not text:
+        return []
+    (vec,) = await embed_texts([text])
+    res = await execute(
+        supabase.rpc(
+            "match_dccts_topics",
+            {
+                "query_embedding": vec,
+                "match_scope": scope,
+                "match_count": max(1, min(int(k or 8), 50)),
+                "min_similarity": min_similarity,
+            },
+        )
+    )
+    return res.data or []
+
+
+# ---------- Tools ----------
+@function_tool
+async def match_topics(
+    text: str, scope: Optional[str] = None, k: int = 8, min_similarity: float = 0.3
+) -> str:
+    """
+    Semantische Suche: die k ähnlichsten Topics zum Event-Text als JSON:
+      {"topics":[{topic_id,title,scope,labels,status,summary,anchors,last_event_ts,similarity}], "count":N}
+    - scope: optional (z.B. "acme:web")
+    - k: 1..50 (Default 8)
+    - min_similarity: 0..1, schwächere Treffer werden weggelassen
+    """
+    rows = await match_topics_for_text(text, scope, k, min_similarity)
+    for r in rows:
+        r["similarity"] = round(float(r.get("similarity") or 0.0), 4)
+    return json.dumps({"topics": rows, "count": len(rows)}, ensure_ascii=False)
@@ -0,0 +1,172 @@
+# providers/topic_summarizer.py
+# Rollierende Topic-Summaries: nur Topics mit neuen Events seit dem Watermark
+# (summary_event_ts), nur diese neuen Events, mehrere Topics pro LLM-Call.
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from agents import Runner, trace
+from custom_agents.topic_summary_agent import topic_summary_agent
+from models import TopicSummaryBatch
+from providers.supabase_client import execute, supabase
+from providers.topic_index import index_topics_safe
+
+logger = logging.getLogger(__name__)
+
+# Intervall des Hintergrund-Loops (0 = aus, dann nur per Endpoint)
+SUMMARY_INTERVAL_SECONDS = float(os.getenv("TOPIC_SUMMARY_INTERVAL_SECONDS", "300"))
+SUMMARY_BATCH_SIZE = int(os.getenv("TOPIC_SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_CONCURRENCY = int(os.getenv("TOPIC_SUMMARY_CONCURRENCY", "2"))
+SUMMARY_MAX_TOPICS = 200
+EVENTS_PER_TOPIC = 30
+EVENT_BODY_CHARS = 600
+
+_run_lock = asyncio.Lock()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _due_topics(limit: int) -> List[Dict]:
+    res = await execute(supabase.rpc("dccts_topics_summary_due", {"p_limit": limit}))
+    return res.data or []
+
+
+async def _new_events(topic_ids: List[str]) -> Dict[str, List[Dict]]:
+    res = await execute(
+        supabase.rpc(
+            "dccts_topic_new_events",
+            {
+                "p_topic_ids": topic_ids,
+                "p_per_topic": EVENTS_PER_TOPIC,
+                "p_body_chars": EVENT_BODY_CHARS,
+            },
+        )
+    )
+    out: Dict[str, List[Dict]] = {}
+    for r in res.data or []:
+        out.setdefault(r["topic_id"], []).append(r)
+    return out
+
+
+async def _advance_watermark(topic_id: str, event_ts: Optional[str]) -> None:
+    await execute(
+        supabase.table("dccts_topics")
+        .update({"summary_event_ts": event_ts})
+        .eq("topic_id", topic_id)
+    )
+
+
+async def _summarize_batch(topics: List[Dict]) -> Dict[str, int]:
+    stats = {"summarized": 0, "skipped": 0}
+    events = await _new_events([t["topic_id"] for t in topics])
+
+    work = []
+    for t in topics:
+        evs = events.get(t["topic_id"]) or []
+        if not evs:
+            # Signal ohne verlinkte neue Events → nichts zu tun, Watermark nachziehen
+            await _advance_watermark(t["topic_id"], t.get("last_event_ts"))
+            stats["skipped"] += 1
+            continue
+        work.append((t, evs))
+    if not work:
+        return stats
+
+    payload = {
+        "topics": [
+            {
+                "topic_id": t["topic_id"],
+                "title": t.get("title"),
+                "previous_summary": t.get("summary"),
+                "new_events": [
+                    {
+                        k: e.get(k)
+                        for k in ("ts", "event_type", "actor", "title", "body")
+                    }
+                    for e in evs
+                ],
+            }
+            for t, evs in work
+        ]
+    }
+    with trace("TopicSummaries"):
+        run = await Runner.run(
+            topic_summary_agent,
+            json.dumps(payload, ensure_ascii=False),
+            max_turns=2,
+        )
+    out = run.final_output
+    if not isinstance(out, TopicSummaryBatch):
+        out = TopicSummaryBatch.model_validate(out)
+    summaries = {s.topic_id: s.summary.strip() for s in out.summaries}
+
+    to_index = []
+    for t, evs in work:
+        summary = summaries.get(t["topic_id"])
+        if not summary:
+            continue  # bleibt fällig, nächster Lauf versucht es erneut
+        patch = {
+            "summary": summary,
+            # Watermark = jüngstes tatsächlich zusammengefasstes Event
+            "summary_event_ts": max(e["ts"] for e in evs),
+            "summary_updated_at": _now_iso(),
+        }
+        await execute(
+            supabase.table("dccts_topics").update(patch).eq("topic_id", t["topic_id"])
+        )
+        to_index.append({**t, "summary": summary})
+        stats["summarized"] += 1
+
+    # Summary fließt in das Topic-Embedding ein
+    await index_topics_safe(to_index)
+    return stats
+
+
+async def run_topic_summaries(limit: int = SUMMARY_MAX_TOPICS) -> Dict:
+    """
+    Ein Summarizer-Lauf über alle fälligen Topics (in Batches, begrenzt parallel).
+    Überlappende Läufe werden übersprungen.
+    """
+    if _run_lock.locked():
+        return {"running": True}
+    async with _run_lock:
+        due = await _due_topics(max(1, min(int(limit), 500)))
+        batches = [
+            due[i : i + SUMMARY_BATCH_SIZE]
+            for i in range(0, len(due), SUMMARY_BATCH_SIZE)
+        ]
+        sem = asyncio.Semaphore(max(1, SUMMARY_CONCURRENCY))
+
+        async def run_batch(batch: List[Dict]) -> Dict[str, int]:
+            async with sem:
+                try:
+                    return await _summarize_batch(batch)
+                except Exception:
+                    logger.exception("[summaries] batch failed (%d topics)", len(batch))
+                    return {"failed": len(batch)}
+
+        results = await asyncio.gather(*(run_batch(b) for b in batches))
+        stats = {"due": len(due), "summarized": 0, "skipped": 0, "failed": 0}
+        for r in results:
+            for k, v in r.items():
+                stats[k] += v
+        return stats
+
+
+async def summary_loop() -> None:
+    """Hintergrund-Loop (läuft im App-Lifespan, wenn SUMMARY_INTERVAL_SECONDS > 0)."""
+    while True:
+        try:
+            stats = await run_topic_summaries()
+            if stats.get("summarized") or stats.get("failed"):
+                logger.info("[summaries] %s", stats)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[summaries] run failed")
+        await asyncio.sleep(SUMMARY_INTERVAL_SECONDS)
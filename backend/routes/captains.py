@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from providers import captains
+
+router = APIRouter()
+
+
+@router.post("/{captain_id}/invalidate")
+async def invalidate_captain_endpoint(captain_id: str):
+    """Nach dem Bearbeiten eines Captains aufrufen, damit alle Routes neu laden."""
+    return {"captain_id": captain_id, "invalidated": captains.invalidate(captain_id)}
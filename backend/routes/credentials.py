@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from providers import credentials
+
+router = APIRouter()
+
+
+@router.post("/{user_id}/invalidate")
+async def invalidate_credentials_endpoint(user_id: str):
+    """Nach Connect/Disconnect von Jira oder Slack aufrufen, damit neue Tokens greifen."""
+    return {"user_id": user_id, "invalidated": credentials.invalidate(user_id)}
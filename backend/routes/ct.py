@@ -1,51 +1,136 @@
+import asyncio
 import json
-from typing import Any, Dict, List
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
 from agents import Runner, trace
 from custom_agents.ct_agent import ct_agent
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import PlainTextResponse
+from providers.ct_cache import forget_assignment, lookup_assignment, remember_assignment
+from providers.ct_classifier import classify_event
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Wie viele Events parallel durch den ct_agent laufen (pro Request)
+CT_CONCURRENCY = int(os.getenv("CT_CONCURRENCY", "8"))
+CT_MAX_CONCURRENCY = 64
+
 
 @router.post("/", response_class=PlainTextResponse)
-async def ct_endpoint(request: Request):
+async def ct_endpoint(
+    request: Request,
+    concurrency: Optional[int] = None,
+    rules: bool = True,
+    reprocess: bool = False,
+):
     try:
         payload = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
     items = payload if isinstance(payload, list) else [payload]
-    results = 0
-    last_output = ""
+    limit = max(1, min(int(concurrency or CT_CONCURRENCY), CT_MAX_CONCURRENCY))
 
-    for item in items:
-        ues = (item or {}).get("ues")
+    # Events je Scope in Eingangsreihenfolge sammeln: Scopes laufen parallel,
+    # innerhalb eines Scopes strikt nacheinander (Topic-Anlage bleibt konsistent).
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    lanes: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+    for idx, item in enumerate(items):
+        ues = (item or {}).get("ues") if isinstance(item, dict) else None
         if not isinstance(ues, dict):
+            results[idx] = {"index": idx, "ok": False, "error": "missing_ues"}
             continue
         ev_min = project_event(ues)
-        msgs = build_messages(ev_min)
+        lanes.setdefault(ev_min["scope"], []).append((idx, ev_min))
 
-        with trace(f"CT:{ev_min.get('event_id')}"):
-            run = await Runner.run(ct_agent, msgs, max_turns=12)
+    sem = asyncio.Semaphore(limit)
 
-        out = getattr(run, "final_output", None)
-        if callable(out):
-            out = await out()
-        if out is None:
-            out = getattr(run, "output", None)
-        last_output = "" if out is None else str(out)
-        results += 1
+    async def run_lane(lane: List[Tuple[int, Dict[str, Any]]]) -> None:
+        for idx, ev_min in lane:
+            async with sem:
+                results[idx] = await process_event(
+                    idx, ev_min, rules=rules, reprocess=reprocess
+                )
+
+    await asyncio.gather(*(run_lane(lane) for lane in lanes.values()))
 
+    ok = [r for r in results if r and r.get("ok")]
+    last_output = json.dumps(ok[-1]["decision"], ensure_ascii=False) if ok else ""
     return PlainTextResponse(
         json.dumps(
-            {"processed": len(items), "ok": results, "last_output": last_output},
+            {
+                "processed": len(items),
+                "ok": len(ok),
+                "results": results,
+                "last_output": last_output,
+            },
             ensure_ascii=False,
         )
     )
 
 
+async def process_event(
+    idx: int, ev_min: Dict[str, Any], rules: bool = True, reprocess: bool = False
+) -> Dict[str, Any]:
+    """
+    Ein Event zuordnen: bereits verarbeitete Events (event_id/dedup_fingerprint) kommen
+    aus dem Zuordnungs-Cache, sonst deterministische Vorklassifikation, nur mehrdeutige
+    Events laufen durch den ct_agent. reprocess=True umgeht den Cache (z. B. nach
+    Regeländerungen). Fehler bleiben auf dieses Event beschränkt.
+    """
+    event_id = ev_min.get("event_id")
+    try:
+        if reprocess:
+            await forget_assignment(ev_min)
+        else:
+            cached = await lookup_assignment(ev_min)
+            if cached is not None:
+                return {
+                    "index": idx,
+                    "event_id": event_id,
+                    "ok": True,
+                    "source": "cache",
+                    "decision": cached,
+                }
+
+        if rules:
+            decision = await classify_event(ev_min)
+            if decision is not None:
+                remember_assignment(ev_min, decision.model_dump())
+                return {
+                    "index": idx,
+                    "event_id": event_id,
+                    "ok": True,
+                    "source": "rules",
+                    "decision": decision.model_dump(),
+                }
+
+        msgs = build_messages(ev_min)
+        with trace(f"CT:{event_id}"):
+            run = await Runner.run(ct_agent, msgs, max_turns=12)
+
+        out = getattr(run, "final_output", None)
+        if callable(out):
+            out = await out()
+        if out is None:
+            out = getattr(run, "output", None)
+        decision = out.model_dump() if hasattr(out, "model_dump") else out
+        remember_assignment(ev_min, decision)
+        return {
+            "index": idx,
+            "event_id": event_id,
+            "ok": True,
+            "source": "agent",
+            "decision": decision,
+        }
+    except Exception as e:
+        logger.exception("[ct] event %s failed", event_id)
+        return {"index": idx, "event_id": event_id, "ok": False, "error": str(e)}
+
+
 def project_event(ues: Dict[str, Any]) -> Dict[str, Any]:
     a = ues.get("artefact") or {}
     r = ues.get("refs") or {}
@@ -55,6 +140,7 @@ def project_event(ues: Dict[str, Any]) -> Dict[str, Any]:
         "source": ues.get("source"),
         "source_account": ues.get("source_account"),
         "event_type": ues.get("event_type"),
+        "dedup_fingerprint": ues.get("dedup_fingerprint"),
         "timestamp": ues.get("timestamp"),
         "actor_id": (ues.get("actor") or {}).get("id"),
         "object_key": r.get("object_key"),
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException
+from providers.plan_history import get_plan_at_version, list_plan_versions
+from providers.supabase_providers import _fetch_plan, _save_plan
+
+router = APIRouter()
+
+
+@router.get("/{captain_id}/versions")
+def list_versions_endpoint(captain_id: str, limit: int = 50):
+    """Listet die gespeicherten Plan-Versionen eines Captains (neueste zuerst)."""
+    return {"captain_id": captain_id, "versions": list_plan_versions(captain_id, limit)}
+
+
+@router.get("/{captain_id}/versions/{version}")
+def get_version_endpoint(captain_id: str, version: int):
+    """Rekonstruiert den Plan zum Stand einer Version."""
+    plan = get_plan_at_version(captain_id, version)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan-Version nicht gefunden")
+    return {"captain_id": captain_id, "version": version, "plan": plan}
+
+
+@router.post("/{captain_id}/versions/{version}/restore")
+def restore_version_endpoint(captain_id: str, version: int):
+    """Setzt den Plan auf eine frühere Version zurück (Undo) – als neue Version."""
+    plan = get_plan_at_version(captain_id, version)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan-Version nicht gefunden")
+    _save_plan(captain_id, plan, _fetch_plan(captain_id))
+    return {"captain_id": captain_id, "restored_from": version, "items": len(plan)}
@@ -1,118 +1,148 @@
+import asyncio
+import json
+import logging
 import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
 from agents import Runner, trace
 from custom_agents.tasks_agent import tasks_agent
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
-from models import UserContext
+from fastapi.responses import JSONResponse, StreamingResponse
+from models import IssueContext, UserContext
+from providers import supabase_client as db
+from providers.task_index import TaskIndex, dedup_suggestions, load_task_index
+from providers.tasks_providers import (
+    MAX_ISSUES,
+    MAX_WINDOW_HOURS,
+    load_issue_contexts,
+    since_iso,
+)
 
 load_dotenv(override=True)
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Fan-out: Issues je Agent-Lauf (Token-Budget grob geschätzt) und parallele Läufe
+TASKS_BATCH_TOKENS = int(os.getenv("TASKS_BATCH_TOKENS", "12000"))
+TASKS_BATCH_MAX_ISSUES = int(os.getenv("TASKS_BATCH_MAX_ISSUES", "25"))
+TASKS_CONCURRENCY = int(os.getenv("TASKS_CONCURRENCY", "4"))
+
 
 @router.post("/")
 async def tasks_endpoint(request: Request):
     body = await request.json()
     user_id = body.get("user_id")
     captain_id = body.get("captain_id")
+    full = bool(body.get("full", False))  # True → alle Issues, Watermark ignorieren
 
     if not user_id or not captain_id:
         raise HTTPException(
             status_code=400, detail="user_id und captain_id sind erforderlich"
         )
 
-    # Der Agent hat schon feste Instruktionen; Prompt kann minimal bleiben
-    messages = [
-        {"role": "user", "content": "Analysiere Issues und liefere Task-Vorschläge."},
-    ]
-
-    context = UserContext(user_id=user_id, captain_id=captain_id)
+    stream = bool(body.get("stream", False))  # True → NDJSON je fertigem Batch
+    window_hours = body.get("window_hours")  # Event-Zeitfenster, Default 30 Tage
+    if window_hours is not None:
+        try:
+            # Vergleichskette weist auch NaN/inf ab (sonst OverflowError in timedelta)
+            valid = not isinstance(window_hours, bool) and (
+                0 < float(window_hours) <= MAX_WINDOW_HOURS
+            )
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"window_hours muss eine Zahl in (0, {MAX_WINDOW_HOURS}] sein",
+            )
+        window_hours = float(window_hours)
 
+    # Nur Issues mit Events seit dem letzten Lauf; nichts Neues → kein Agent-Lauf
     try:
-        with trace("Tasks"):
-            run_result = await Runner.run(
-                tasks_agent,
-                messages,
-                context=context,
-                max_turns=4,  # 1 Tool-Call + Antwort reicht
+        issue_keys, last_ts = await changed_issues(captain_id, full, window_hours)
+        if issue_keys:
+            contexts = await load_issue_contexts(captain_id, issue_keys, window_hours)
+            index = await load_task_index(captain_id, issue_keys)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Supabase error: {e.response.status_code} {e.response.text}",
+        )
+    if not issue_keys:
+        if stream:
+            return StreamingResponse(
+                iter([ndjson({"type": "done", "batches": 0, "failed": 0, "tasks": 0})]),
+                media_type="application/x-ndjson",
             )
+        return JSONResponse(content=[])
 
-        output = getattr(run_result, "final_output", None)
-        if callable(output):
-            output = await output()
+    # Issues in token-budgetierte Batches aufteilen; Batches laufen parallel (begrenzt),
+    # ein fehlschlagender Batch kostet nur seine Issues, nicht den ganzen Lauf.
+    # Jeder fertige Batch wird sofort geprüft und gespeichert (Micro-Batch-Upsert).
+    batches = plan_batches(contexts) or [issue_keys]
+    # Watermark nur über die tatsächlich analysierten Issues
+    new_watermark = max(
+        (last_ts[k] for b in batches for k in b if k in last_ts), default=None
+    )
+    sem = asyncio.Semaphore(TASKS_CONCURRENCY)
 
-        # Pydantic-Listen sauber serialisieren
-        if isinstance(output, list):
+    async def run_batch(n: int, keys: List[str]) -> Dict[str, Any]:
+        async with sem:
             try:
-                # Falls Elemente Pydantic-Modelle sind
-                output = [getattr(x, "model_dump", lambda: x)() for x in output]
-            except Exception:
-                # Wenn bereits dicts
-                pass
-
-        if output is None:
-            output = []  # gemäß Agent-Contract: leere Liste bei keinen Tasks
-
-        # ---------- NEU: Tasks in Supabase speichern (Upsert) ----------
-        if output:
-            # Map auf DB-Spalten
-            tasks_payload = []
-            for t in output:
-                # minimaler Schutz: nur valide Vorschläge nehmen
-                if not all(
-                    k in t
-                    for k in (
-                        "issue_key",
-                        "title",
-                        "reason",
-                        "description",
-                        "priority",
-                        "plan",
-                    )
-                ):
-                    continue
-                tasks_payload.append(
-                    {
-                        "captain_id": captain_id,
-                        "issue_key": t["issue_key"],
-                        "title": t["title"],
-                        "reason": t["reason"],
-                        "description": t["description"],
-                        "priority": t["priority"],
-                        "plan": t["plan"],
-                        # "status": "open",  # DB-Default greift
-                    }
+                suggestions = await run_tasks_agent(
+                    user_id, captain_id, keys, window_hours
                 )
+                saved = await save_suggestions(captain_id, index, suggestions)
+                return {"type": "tasks", "batch": n, "tasks": saved}
+            except Exception as e:
+                logger.exception(
+                    "[tasks] batch %d/%d failed (%d issues)", n, len(batches), len(keys)
+                )
+                return {"type": "error", "batch": n, "issues": keys, "error": str(e)}
+
+    async def results() -> AsyncIterator[Dict[str, Any]]:
+        failed = produced = 0
+        with trace("Tasks"):
+            pending = [
+                asyncio.ensure_future(run_batch(n, keys))
+                for n, keys in enumerate(batches, 1)
+            ]
+            for fut in asyncio.as_completed(pending):
+                r = await fut
+                if r["type"] == "error":
+                    failed += 1
+                else:
+                    produced += len(r["tasks"])
+                yield r
+        # Watermark nur weiterschieben, wenn alle Batches durchliefen
+        # (sonst würden die Issues fehlgeschlagener Batches nie erneut analysiert)
+        if not failed:
+            await set_tasks_watermark(captain_id, new_watermark)
+        yield {
+            "type": "done",
+            "batches": len(batches),
+            "failed": failed,
+            "tasks": produced,
+        }
+
+    if stream:
+
+        async def body_iter() -> AsyncIterator[str]:
+            async for r in results():
+                yield ndjson(r)
+
+        return StreamingResponse(body_iter(), media_type="application/x-ndjson")
 
-            if tasks_payload:
-                upsert_url = f"{SUPABASE_URL}/rest/v1/tasks?on_conflict=captain_id,issue_key,title"
-                headers = {
-                    "apikey": SUPABASE_KEY,
-                    "Authorization": f"Bearer {SUPABASE_KEY}",
-                    "Content-Type": "application/json",
-                    # return=representation gibt die Rows zurück
-                    "Prefer": "resolution=merge-duplicates,return=representation",
-                }
-
-                async with httpx.AsyncClient(timeout=30) as client:
-                    resp = await client.post(
-                        upsert_url, headers=headers, json=tasks_payload
-                    )
-                    if resp.status_code not in (200, 201):
-                        # PostgREST-Fehler mit Details durchreichen
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Supabase upsert error: {resp.status_code} {resp.text}",
-                        )
-                    # Optionales Logging der gespeicherten Rows
-                    saved = resp.json()
-                    print(f"[tasks] upserted: {len(saved)} / {len(tasks_payload)}")
+    try:
+        output: List[dict] = []
+        async for r in results():
+            if r["type"] == "tasks":
+                output.extend(r["tasks"])
+            elif r["type"] == "done" and r["failed"] == len(batches):
+                raise RuntimeError(f"alle {r['failed']} Batches fehlgeschlagen")
 
         # ---------- Response: unverändert die Suggestions-Liste ----------
         return JSONResponse(content=output)
@@ -123,52 +153,177 @@ async def tasks_endpoint(request: Request):
         raise HTTPException(status_code=500, detail=f"Tasks-Run fehlgeschlagen: {e}")
 
 
-async def get_jira_credentials(user_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/jira_connections?user_id=eq.{user_id}",
-            headers={
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Accept": "application/json",
-            },
+def ndjson(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+async def save_suggestions(
+    captain_id: str, index: TaskIndex, suggestions: List[dict]
+) -> List[dict]:
+    """
+    Vorschläge eines Batches validieren, gegen den Task-Index deduplizieren und
+    upserten. Gibt die gespeicherten Vorschläge (Suggestion-Form) zurück.
+    """
+    # Map auf DB-Spalten; minimaler Schutz: nur valide Vorschläge nehmen
+    valid = [
+        t
+        for t in suggestions
+        if isinstance(t, dict)
+        and all(
+            k in t
+            for k in ("issue_key", "title", "reason", "description", "priority", "plan")
         )
-        response.raise_for_status()
-        data = response.json()
-        if not data:
-            raise HTTPException(status_code=404, detail="Kein Jira-Zugang gefunden")
-        return data[0]
-
-
-async def get_slack_credentials(user_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/slack_connections?user_id=eq.{user_id}",
-            headers={
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Accept": "application/json",
-            },
+    ]
+    # Beinahe-Duplikate (bestehende Tasks + frühere Batches dieses Laufs) verwerfen
+    kept, dropped = dedup_suggestions(index, valid)
+    for d in dropped:
+        logger.info(
+            "[tasks] dropped near-duplicate %s %r (duplicate_of=%s, similarity=%s)",
+            d.get("issue_key"),
+            d.get("title"),
+            d.get("duplicate_of"),
+            d.get("similarity"),
         )
-        response.raise_for_status()
-        data = response.json()
-        if not data:
-            raise HTTPException(status_code=404, detail="Kein Slack-Zugang gefunden")
-        return data[0]
+    if not kept:
+        return []
 
+    tasks_payload = [
+        {
+            "captain_id": captain_id,
+            "issue_key": t["issue_key"],
+            "title": t["title"],
+            "reason": t["reason"],
+            "description": t["description"],
+            "priority": t["priority"],
+            "plan": t["plan"],
+            # "status": "open",  # DB-Default greift
+        }
+        for t in kept
+    ]
+    try:
+        # return=representation gibt die Rows zurück
+        saved = await db.upsert(
+            "tasks",
+            tasks_payload,
+            on_conflict="captain_id,issue_key,title",
+            timeout=30,
+        )
+    except httpx.HTTPStatusError as e:
+        # PostgREST-Fehler mit Details durchreichen
+        raise RuntimeError(
+            f"Supabase upsert error: {e.response.status_code} {e.response.text}"
+        )
+    # Optionales Logging der gespeicherten Rows
+    print(f"[tasks] upserted: {len(saved)} / {len(tasks_payload)}")
+    return kept
 
-async def get_project_channels(project_id: str) -> list[str]:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/projects?id=eq.{project_id}&select=channels",
-            headers={
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Accept": "application/json",
-            },
+
+def plan_batches(contexts: List[IssueContext]) -> List[List[str]]:
+    """
+    Issue-Keys in Batches packen: je Batch höchstens TASKS_BATCH_TOKENS (grob geschätzt,
+    ~4 Zeichen/Token) und TASKS_BATCH_MAX_ISSUES Issues. Ein einzelnes übergroßes Issue
+    bekommt einen eigenen Batch.
+    """
+    batches: List[List[str]] = []
+    current: List[str] = []
+    budget = 0
+    for ic in contexts:
+        tokens = len(ic.model_dump_json()) // 4 + 1
+        if current and (
+            budget + tokens > TASKS_BATCH_TOKENS
+            or len(current) >= TASKS_BATCH_MAX_ISSUES
+        ):
+            batches.append(current)
+            current, budget = [], 0
+        current.append(ic.issue_key)
+        budget += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def run_tasks_agent(
+    user_id: str,
+    captain_id: str,
+    issue_keys: List[str],
+    window_hours: Optional[float] = None,
+) -> List[dict]:
+    """Ein tasks_agent-Lauf für genau diese Issues; gibt die Vorschläge als dicts zurück."""
+    # Der Agent hat schon feste Instruktionen; Prompt kann minimal bleiben
+    messages = [
+        {"role": "user", "content": "Analysiere Issues und liefere Task-Vorschläge."},
+    ]
+    context = UserContext(
+        user_id=user_id,
+        captain_id=captain_id,
+        issue_keys=issue_keys,
+        window_hours=window_hours,
+    )
+    run_result = await Runner.run(
+        tasks_agent,
+        messages,
+        context=context,
+        max_turns=4,  # 1 Tool-Call + Antwort reicht
+    )
+
+    output = getattr(run_result, "final_output", None)
+    if callable(output):
+        output = await output()
+
+    # Pydantic-Listen sauber serialisieren
+    if isinstance(output, list):
+        try:
+            # Falls Elemente Pydantic-Modelle sind
+            output = [getattr(x, "model_dump", lambda: x)() for x in output]
+        except Exception:
+            # Wenn bereits dicts
+            pass
+
+    # gemäß Agent-Contract: leere Liste bei keinen Tasks
+    return output or []
+
+
+async def changed_issues(
+    captain_id: str, full: bool = False, window_hours: Optional[float] = None
+) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Issues mit Events nach dem Tasks-Watermark des Captains (bzw. im ganzen Zeitfenster
+    bei full/erstem Lauf) und der jüngste Event-ts je Issue.
+    Höchstens MAX_ISSUES je Lauf, älteste zuerst: die übrigen (jüngeren) Issues liegen
+    damit nach dem neuen Watermark und kommen im nächsten Lauf dran.
+    """
+    since = since_iso(window_hours)
+    if not full:
+        row = await db.select_one(
+            "captains", {"id": db.eq(captain_id)}, columns="tasks_watermark"
         )
-        response.raise_for_status()
-        data = response.json()
-        if not data or not data[0].get("channels"):
-            return []
-        return data[0]["channels"]
+        if row and row.get("tasks_watermark") and row["tasks_watermark"] > since:
+            since = row["tasks_watermark"]
+
+    # Begrenzung + Tie-sicherer Schnitt passieren in der RPC (älteste zuerst), damit
+    # PostgREST max-rows nie die ältesten Issues abschneidet
+    rows = await db.rpc(
+        "dccts_issues_changed_since",
+        {"p_captain_id": captain_id, "p_since": since, "p_limit": MAX_ISSUES},
+    )
+    rows = rows or []
+    return [r["issue_key"] for r in rows], {r["issue_key"]: r["last_ts"] for r in rows}
+
+
+async def set_tasks_watermark(captain_id: str, watermark: Optional[str]) -> None:
+    if not watermark:
+        return
+    try:
+        await db.update(
+            "captains", {"tasks_watermark": watermark}, {"id": db.eq(captain_id)}
+        )
+    except httpx.HTTPStatusError as e:
+        # Nicht fatal: nächster Lauf verarbeitet dieselben Issues erneut
+        print(f"[tasks] watermark update failed: {e.response.status_code}")
+
+
+async def get_project_channels(project_id: str) -> list[str]:
+    row = await db.select_one("projects", {"id": db.eq(project_id)}, columns="channels")
+    if not row or not row.get("channels"):
+        return []
+    return row["channels"]
@@ -1,7 +1,5 @@
 import json
-import os
 
-import httpx
 from agents import Runner, trace
 from custom_agents.ticket_maintenance_agent import ticket_maintenance_agent
 from dotenv import load_dotenv
@@ -9,13 +7,11 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.encoders import jsonable_encoder  # << NEU
 from fastapi.responses import JSONResponse
 from models import UserContext
+from providers.bootstrap import bootstrap
 from pydantic import BaseModel  # << optional für isinstance-Check
 
 load_dotenv(override=True)
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-
 router = APIRouter()
 
 
@@ -31,8 +27,11 @@ async def get_ticket_maintenance_endpoint(request: Request):
     if not captain_id:
         raise HTTPException(status_code=400, detail="captain_id fehlt")
 
-    # ---- Captain lesen: jira_project_key + channels ----
-    captain = await get_captain(captain_id)
+    # ---- Captain + Verbindungen parallel laden (alle Pflicht) ----
+    deps = await bootstrap(user_id, captain_id)
+    captain = deps["captain"]
+    jira_connection = deps["jira"]
+    slack_connection = deps["slack"]
     jira_project_key = captain.get("jira_project_key")
     channels = captain.get("channels") or []
 
@@ -42,10 +41,6 @@ async def get_ticket_maintenance_endpoint(request: Request):
     if not jira_project_key:
         raise HTTPException(status_code=400, detail="jira_project_key am Captain fehlt")
 
-    # ---- Verbindungen laden ----
-    jira_connection = await get_jira_credentials(user_id)
-    slack_connection = await get_slack_credentials(user_id)
-
     # ---- Kontext für Agent ----
     user_context = UserContext(
         jira_email=jira_connection["email"],
@@ -104,57 +99,3 @@ async def get_ticket_maintenance_endpoint(request: Request):
         raise HTTPException(
             status_code=500, detail=f"Ticket-Maintenance fehlgeschlagen: {e}"
         )
-
-
-# ---------- Supabase Helfer ----------
-
-
-async def get_captain(captain_id: str) -> dict:
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{SUPABASE_URL}/rest/v1/captains?id=eq.{captain_id}&select=jira_project_key,channels",
-            headers={
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Accept": "application/json",
-            },
-        )
-        r.raise_for_status()
-        data = r.json()
-        if not data:
-            raise HTTPException(status_code=404, detail="Captain nicht gefunden")
-        return data[0]
-
-
-async def get_jira_credentials(user_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/jira_connections?user_id=eq.{user_id}",
-            headers={
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Accept": "application/json",
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
-        if not data:
-            raise HTTPException(status_code=404, detail="Kein Jira-Zugang gefunden")
-        return data[0]
-
-
-async def get_slack_credentials(user_id: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/slack_connections?user_id=eq.{user_id}",
-            headers={
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Accept": "application/json",
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
-        if not data:
-            raise HTTPException(status_code=404, detail="Kein Slack-Zugang gefunden")
-        return data[0]
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from providers.topic_graph import MAX_HOPS, get_graph, graph_payload
+from providers.topic_summarizer import SUMMARY_MAX_TOPICS, run_topic_summaries
+
+router = APIRouter()
+
+
+@router.get("/graph")
+async def topic_graph_endpoint(
+    request: Request,
+    response: Response,
+    scope: str,
+    root: Optional[str] = None,
+    hops: int = 1,
+    types: Optional[str] = None,
+    refresh: bool = False,
+):
+    """
+    Topic-Graph eines Scopes in einem Call:
+    - ohne root: alle Topics + Relationen des Scopes
+    - mit root: k-Hop-Nachbarschaft (hops 0..4)
+    - types: optionaler Filter auf Relationstypen, z. B. types=category,blocks
+    Unterstützt ETag/If-None-Match (304, wenn sich der Graph nicht geändert hat).
+    """
+    g = await get_graph(scope, refresh=refresh)
+    if root and root not in g.nodes and root not in g.adj:
+        raise HTTPException(status_code=404, detail="Topic nicht gefunden")
+
+    etag = f'"{g.etag()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    relation_types = {t.strip() for t in (types or "").split(",") if t.strip()}
+    if root:
+        topic_ids, edges = g.neighbourhood(root, hops, relation_types or None)
+    else:
+        topic_ids = sorted(g.nodes)
+        edges = sorted(
+            e for e in g.edges if not relation_types or e[2] in relation_types
+        )
+
+    return {
+        "scope": scope,
+        "root": root,
+        "hops": max(0, min(hops, MAX_HOPS)) if root else None,
+        **graph_payload(g, topic_ids, edges),
+    }
+
+
+@router.post("/summaries/refresh")
+async def refresh_summaries_endpoint(limit: int = SUMMARY_MAX_TOPICS):
+    """Stößt einen Summarizer-Lauf über alle Topics mit neuen Events an."""
+    return await run_topic_summaries(limit)
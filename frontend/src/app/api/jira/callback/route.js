@@ -96,6 +96,7 @@ export async function GET(request) {
             console.error('DB Insert Error:', dbError1)
             return redirectTo(url, '/error?reason=db_failed')
         }
+        await invalidateBackendCredentials(user.id)
 
         // Optional: Token-Refresh planen (nur Logging)
         try {
@@ -132,6 +133,16 @@ function redirectTo(baseUrl, path) {
     return NextResponse.redirect(targetUrl)
 }
 
+// Backend cached Tokens je User – nach neuem Connect verwerfen.
+// Best effort: schlägt der Call fehl, greift backendseitig die TTL.
+async function invalidateBackendCredentials(userId) {
+    try {
+        await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/credentials/${userId}/invalidate`, { method: 'POST' })
+    } catch (e) {
+        console.warn('Credentials-Cache invalidieren fehlgeschlagen:', e)
+    }
+}
+
 async function fetchToken(code) {
     const tokenRequest = {
         grant_type: 'authorization_code',
@@ -45,6 +45,7 @@ export async function GET(request) {
         console.error("DB Insert Error:", dbError)
         return redirectTo(url, '/error?reason=db_failed')
     }
+    await invalidateBackendCredentials(user.id)
 
     // 7. Erfolg!
     return redirectTo(url, '/pages/dashboard')
@@ -58,6 +59,16 @@ function redirectTo(baseUrl, path) {
     return NextResponse.redirect(new URL(path, baseUrl))
 }
 
+// Backend cached Tokens je User – nach neuem Connect verwerfen.
+// Best effort: schlägt der Call fehl, greift backendseitig die TTL.
+async function invalidateBackendCredentials(userId) {
+    try {
+        await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/credentials/${userId}/invalidate`, { method: 'POST' })
+    } catch (e) {
+        console.warn('Credentials-Cache invalidieren fehlgeschlagen:', e)
+    }
+}
+
 async function fetchSlackToken(code) {
     const res = await fetch('https://slack.com/api/oauth.v2.access', {
         method: 'POST',
@@ -5,6 +5,7 @@ import { useEffect, useState } from 'react';
 import { createClient } from '@/utils/supabase/client';
 import Section from './Section';
 import ChannelsModal from './ChannelsModal';
+import { invalidateCaptainCache } from '@/helpers/helpers';
 
 export default function Sidebar() {
     const { captainId } = useParams();
@@ -138,6 +139,7 @@ export default function Sidebar() {
                 .update({ channels: clean })
                 .eq('id', captainId);
             if (error) throw error;
+            await invalidateCaptainCache(captainId);
         } catch (e) {
             console.error('Konnte Channels nicht speichern:', e);
             setErrorMsg('Konnte Channels nicht speichern.');
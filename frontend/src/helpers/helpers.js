@@ -76,6 +76,19 @@ export async function chat() {
     }
 }
 
+// Backend cached Captain-Meta (jira_project_key, channels) – nach jeder Änderung verwerfen.
+// Best effort: schlägt der Call fehl, greift backendseitig die TTL.
+export async function invalidateCaptainCache(captainId) {
+    if (!captainId) return;
+    try {
+        await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/captains/${captainId}/invalidate`, {
+            method: 'POST',
+        });
+    } catch (e) {
+        console.warn('Captain-Cache invalidieren fehlgeschlagen:', e);
+    }
+}
+
 export const AssistantHeader = ({ name, isLoading }) => (
     <div className="text-xs font-semibold text-gray-700 flex items-center gap-2">
         <CaptainLottie isLoading={isLoading} className="w-8" />
@@ -0,0 +1,17 @@
+-- Plan-Historie für captains.plan: Operation-Log (delta) + periodische Snapshots.
+create table if not exists public.captain_plan_history (
+    id          bigint generated always as identity primary key,
+    captain_id  uuid        not null references public.captains (id) on delete cascade,
+    version     integer     not null,
+    kind        text        not null check (kind in ('snapshot', 'delta')),
+    payload     jsonb       not null,
+    op_count    integer     not null default 0,
+    item_count  integer     not null default 0,
+    created_at  timestamptz not null default now(),
+    unique (captain_id, version)
+);
+
+-- Rekonstruktion: letzter Snapshot <= v, danach Deltas in Versionsreihenfolge
+create index if not exists captain_plan_history_snapshots_idx
+    on public.captain_plan_history (captain_id, version desc)
+    where kind = 'snapshot';
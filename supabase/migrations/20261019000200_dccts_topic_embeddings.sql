@@ -0,0 +1,49 @@
+-- Semantischer Topic-Index: Embedding über title/description/summary (text-embedding-3-small).
+create extension if not exists vector with schema extensions;
+
+alter table public.dccts_topics
+    add column if not exists embedding      extensions.vector(1536),
+    add column if not exists embedding_hash text;
+
+create index if not exists dccts_topics_embedding_idx
+    on public.dccts_topics
+    using hnsw (embedding extensions.vector_cosine_ops);
+
+-- Top-k Topics (optional je Scope) nach Cosine-Similarity
+create or replace function public.match_dccts_topics(
+    query_embedding extensions.vector(1536),
+    match_scope     text    default null,
+    match_count     integer default 8,
+    min_similarity  float   default 0
+)
+returns table (
+    topic_id      text,
+    title         text,
+    scope         text,
+    labels        text[],
+    status        text,
+    summary       text,
+    anchors       text[],
+    last_event_ts timestamptz,
+    similarity    float
+)
+language sql
+stable
+set search_path = public, extensions
+as $$
+    select t.topic_id,
+           t.title,
+           t.scope,
+           t.labels,
+           t.status,
+           t.summary,
+           t.anchors,
+           t.last_event_ts,
+           1 - (t.embedding <=> query_embedding) as similarity
+    from public.dccts_topics t
+    where t.embedding is not null
+      and (match_scope is null or t.scope = match_scope)
+      and 1 - (t.embedding <=> query_embedding) >= min_similarity
+    order by t.embedding <=> query_embedding
+    limit greatest(1, least(match_count, 50));
+$$;
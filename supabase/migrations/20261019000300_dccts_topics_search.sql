@@ -0,0 +1,85 @@
+-- Volltextsuche für list_topics: ein Query statt zwei ILIKE-Scans (title/description).
+create extension if not exists pg_trgm with schema extensions;
+
+alter table public.dccts_topics
+    add column if not exists search_tsv tsvector;
+
+-- Gewichtung: Titel > Labels > Beschreibung > Anker. 'simple' = sprachneutral (DE/EN gemischt).
+create or replace function public.dccts_topics_search_tsv()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.search_tsv :=
+        setweight(to_tsvector('simple', coalesce(new.title, '')), 'A')
+        || setweight(to_tsvector('simple', array_to_string(coalesce(new.labels, '{}'), ' ')), 'B')
+        || setweight(to_tsvector('simple', coalesce(new.description, '')), 'C')
+        || setweight(
+               to_tsvector('simple',
+                   regexp_replace(array_to_string(coalesce(new.anchors, '{}'), ' '), '[:/]', ' ', 'g')),
+               'D');
+    return new;
+end;
+$$;
+
+drop trigger if exists dccts_topics_search_tsv_trg on public.dccts_topics;
+create trigger dccts_topics_search_tsv_trg
+    before insert or update of title, description, labels, anchors
+    on public.dccts_topics
+    for each row execute function public.dccts_topics_search_tsv();
+
+-- Backfill bestehender Zeilen
+update public.dccts_topics set title = title where search_tsv is null;
+
+create index if not exists dccts_topics_search_tsv_idx
+    on public.dccts_topics using gin (search_tsv);
+
+-- Teilwort-/Tippfehler-Treffer im Titel (ersetzt '%search%' ILIKE)
+create index if not exists dccts_topics_title_trgm_idx
+    on public.dccts_topics using gin (title extensions.gin_trgm_ops);
+
+-- Gerankte Topic-Suche (optional je Scope)
+create or replace function public.search_dccts_topics(
+    search_query text,
+    match_scope  text    default null,
+    match_count  integer default 50
+)
+returns table (
+    topic_id      text,
+    title         text,
+    scope         text,
+    labels        text[],
+    status        text,
+    created_at    timestamptz,
+    updated_at    timestamptz,
+    summary       text,
+    anchors       text[],
+    participants  text[],
+    last_event_ts timestamptz,
+    rank          real
+)
+language sql
+stable
+set search_path = public, extensions
+as $$
+    with q as (
+        select websearch_to_tsquery('simple', search_query) as tsq
+    )
+    select t.topic_id,
+           t.title,
+           t.scope,
+           t.labels,
+           t.status,
+           t.created_at,
+           t.updated_at,
+           t.summary,
+           t.anchors,
+           t.participants,
+           t.last_event_ts,
+           (ts_rank_cd(t.search_tsv, q.tsq) + similarity(t.title, search_query))::real as rank
+    from public.dccts_topics t, q
+    where (match_scope is null or t.scope = match_scope)
+      and (t.search_tsv @@ q.tsq or t.title % search_query)
+    order by rank desc, t.updated_at desc
+    limit greatest(1, least(match_count, 200));
+$$;
@@ -0,0 +1,77 @@
+-- Atomares Mergen von Topic-Signalen (anchors/participants als Mengen-Union,
+-- last_event_ts nur vorwärts). Ersetzt Read-Modify-Write im Backend.
+create or replace function public.dccts_record_topic_signals(
+    p_topic_id     text,
+    p_anchors      text[]      default '{}',
+    p_participants text[]      default '{}',
+    p_ts           timestamptz default null
+)
+returns boolean
+language sql
+as $$
+    with updated as (
+        update public.dccts_topics t
+        set anchors = array(
+                select distinct x
+                from unnest(coalesce(t.anchors, '{}') || coalesce(p_anchors, '{}')) as x
+                where x is not null
+            ),
+            participants = array(
+                select distinct x
+                from unnest(coalesce(t.participants, '{}') || coalesce(p_participants, '{}')) as x
+                where x is not null
+            ),
+            last_event_ts = greatest(t.last_event_ts, p_ts)
+        where t.topic_id = p_topic_id
+        returning 1
+    )
+    select exists (select 1 from updated);
+$$;
+
+-- Batch-Variante: p_signals = [{"topic_id","anchors":[...],"participants":[...],"ts"}, ...]
+-- Mehrere Einträge je Topic werden vorab zusammengefasst → genau ein UPDATE pro Topic.
+-- Rückgabe: IDs der aktualisierten (existierenden) Topics.
+create or replace function public.dccts_record_topic_signals_batch(p_signals jsonb)
+returns table (topic_id text)
+language sql
+as $$
+    with items as (
+        select s->>'topic_id'                          as topic_id,
+               coalesce(s->'anchors', '[]'::jsonb)      as anchors,
+               coalesce(s->'participants', '[]'::jsonb) as participants,
+               nullif(s->>'ts', '')::timestamptz        as ts
+        from jsonb_array_elements(coalesce(p_signals, '[]'::jsonb)) as s
+    ),
+    merged as (
+        select i.topic_id,
+               array(
+                   select distinct a
+                   from items j, jsonb_array_elements_text(j.anchors) as a
+                   where j.topic_id = i.topic_id
+               ) as anchors,
+               array(
+                   select distinct p
+                   from items j, jsonb_array_elements_text(j.participants) as p
+                   where j.topic_id = i.topic_id
+               ) as participants,
+               max(i.ts) as ts
+        from items i
+        where i.topic_id is not null
+        group by i.topic_id
+    )
+    update public.dccts_topics t
+    set anchors = array(
+            select distinct x
+            from unnest(coalesce(t.anchors, '{}') || m.anchors) as x
+            where x is not null
+        ),
+        participants = array(
+            select distinct x
+            from unnest(coalesce(t.participants, '{}') || m.participants) as x
+            where x is not null
+        ),
+        last_event_ts = greatest(t.last_event_ts, m.ts)
+    from merged m
+    where t.topic_id = m.topic_id
+    returning t.topic_id;
+$$;
@@ -0,0 +1,69 @@
+-- Rollierende Topic-Summaries: Watermark = ts des jüngsten bereits zusammengefassten Events.
+alter table public.dccts_topics
+    add column if not exists summary_event_ts   timestamptz,
+    add column if not exists summary_updated_at timestamptz;
+
+-- Topics mit neuen Events seit dem Watermark (last_event_ts wird von
+-- dccts_record_topic_signals nur vorwärts bewegt)
+create index if not exists dccts_topics_summary_due_idx
+    on public.dccts_topics (last_event_ts)
+    where last_event_ts is not null;
+
+create or replace function public.dccts_topics_summary_due(p_limit integer default 50)
+returns table (
+    topic_id         text,
+    title            text,
+    scope            text,
+    summary          text,
+    summary_event_ts timestamptz,
+    last_event_ts    timestamptz
+)
+language sql
+stable
+as $$
+    select t.topic_id, t.title, t.scope, t.summary, t.summary_event_ts, t.last_event_ts
+    from public.dccts_topics t
+    where t.last_event_ts is not null
+      and (t.summary_event_ts is null or t.last_event_ts > t.summary_event_ts)
+    order by t.last_event_ts desc
+    limit greatest(1, least(p_limit, 500));
+$$;
+
+-- Nur die neuen Events je Topic (ts > summary_event_ts), max. p_per_topic jüngste,
+-- Body gekürzt – ein Query für einen ganzen Topic-Batch.
+create or replace function public.dccts_topic_new_events(
+    p_topic_ids  text[],
+    p_per_topic  integer default 30,
+    p_body_chars integer default 600
+)
+returns table (
+    topic_id   text,
+    event_id   text,
+    ts         timestamptz,
+    event_type text,
+    actor      text,
+    title      text,
+    body       text
+)
+language sql
+stable
+as $$
+    select topic_id, event_id, ts, event_type, actor, title, body
+    from (
+        select et.topic_id,
+               e.event_id,
+               e.ts,
+               e.event_type,
+               e.ues->'actor'->>'display'                  as actor,
+               e.ues->'artefact'->>'title'                 as title,
+               left(e.ues->'artefact'->>'body', p_body_chars) as body,
+               row_number() over (partition by et.topic_id order by e.ts desc) as rn
+        from public.dccts_event_topics et
+        join public.dccts_topics t on t.topic_id = et.topic_id
+        join public.dccts_events e on e.event_id = et.event_id
+        where et.topic_id = any(p_topic_ids)
+          and (t.summary_event_ts is null or e.ts > t.summary_event_ts)
+    ) x
+    where rn <= p_per_topic
+    order by topic_id, ts;
+$$;
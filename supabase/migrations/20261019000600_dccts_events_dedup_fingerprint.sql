@@ -0,0 +1,10 @@
+-- Zuordnungs-Cache im Context-Thread: Replays/Retries über den dedup_fingerprint finden.
+alter table public.dccts_events
+    add column if not exists dedup_fingerprint text;
+
+create index if not exists dccts_events_dedup_fingerprint_idx
+    on public.dccts_events (dedup_fingerprint)
+    where dedup_fingerprint is not null;
+
+create index if not exists dccts_event_topics_event_id_idx
+    on public.dccts_event_topics (event_id);
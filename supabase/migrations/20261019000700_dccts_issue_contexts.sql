@@ -0,0 +1,83 @@
+-- Issue-Kontexte für den Tasks-Agent serverseitig aufbereiten: Gruppierung nach
+-- object_key, Top-N jüngste Events je Issue (Window-Function), Body-Kürzung und
+-- Keyset-Pagination über Issues (last_ts desc, issue_key asc).
+create index if not exists dccts_events_captain_ts_idx
+    on public.dccts_events (captain_id, ts);
+
+create or replace function public.dccts_issue_contexts(
+    p_captain_id uuid,
+    p_since      timestamptz,
+    p_per_issue  integer     default 50,
+    p_body_chars integer     default 800,
+    p_limit      integer     default 100,
+    p_after_ts   timestamptz default null,
+    p_after_key  text        default null
+)
+returns table (
+    issue_key text,
+    web_url   text,
+    last_ts   timestamptz,
+    events    jsonb
+)
+language sql
+stable
+as $$
+    with ranked as (
+        select coalesce(e.object_key, 'unknown') as issue_key,
+               e.event_id,
+               e.ts,
+               e.event_type,
+               e.ues->'actor'->>'display'          as actor,
+               e.ues->'artefact'->>'title'         as title,
+               e.ues->'artefact'->>'body'          as body,
+               e.ues->'refs'->'jira'->>'web_url'   as web_url,
+               row_number() over (
+                   partition by coalesce(e.object_key, 'unknown')
+                   order by e.ts desc
+               ) as rn
+        from public.dccts_events e
+        where e.captain_id = p_captain_id
+          and e.ts >= p_since
+    ),
+    issues as (
+        select r.issue_key,
+               max(r.ts) as last_ts,
+               (array_agg(r.web_url order by r.ts) filter (where r.web_url is not null))[1] as web_url
+        from ranked r
+        group by r.issue_key
+    ),
+    page as (
+        select i.*
+        from issues i
+        where p_after_ts is null
+           or i.last_ts < p_after_ts
+           or (i.last_ts = p_after_ts and i.issue_key > p_after_key)
+        order by i.last_ts desc, i.issue_key
+        limit greatest(1, least(p_limit, 500))
+    )
+    select p.issue_key,
+           p.web_url,
+           p.last_ts,
+           (
+               select jsonb_agg(
+                          jsonb_build_object(
+                              'event_id', r.event_id,
+                              't',        r.ts,
+                              'type',     r.event_type,
+                              'actor',    r.actor,
+                              'title',    r.title,
+                              'body',     case
+                                              when length(r.body) > p_body_chars
+                                                  then left(r.body, p_body_chars) || ' …'
+                                              else r.body
+                                          end
+                          )
+                          order by r.ts
+                      )
+               from ranked r
+               where r.issue_key = p.issue_key
+                 and r.rn <= p_per_issue
+           ) as events
+    from page p
+    order by p.last_ts desc, p.issue_key;
+$$;
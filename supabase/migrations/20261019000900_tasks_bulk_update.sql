@@ -0,0 +1,53 @@
+-- Bulk-Update von Tasks in einem Statement (ein Round-Trip für viele Patches).
+-- p_patches = [{"id", "issue_key"?, "title"?, "reason"?, "priority"?, "status"?,
+--               "description"?, "description_mode"?: "append"|"replace",
+--               "plan"?, "plan_mode"?: "append"|"replace"}, ...]
+-- Append-Regeln wie bisher in update_task: description mit Leerzeile, plan mit
+-- Zeilenumbruch (nur wenn der alte Text nicht schon mit \n endet), Ergebnis getrimmt.
+create or replace function public.tasks_bulk_update(
+    p_captain_id uuid,
+    p_patches    jsonb
+)
+returns setof public.tasks
+language sql
+as $$
+    with patches as (
+        select distinct on ((p->>'id')::uuid)
+               (p->>'id')::uuid as id,
+               p
+        from jsonb_array_elements(coalesce(p_patches, '[]'::jsonb))
+             with ordinality as x(p, ord)
+        where p ? 'id'
+        order by (p->>'id')::uuid, ord desc  -- mehrfach gepatcht → letzter gewinnt
+    )
+    update public.tasks t
+    set issue_key   = coalesce(x.p->>'issue_key', t.issue_key),
+        title       = coalesce(x.p->>'title', t.title),
+        reason      = coalesce(x.p->>'reason', t.reason),
+        priority    = coalesce(x.p->>'priority', t.priority),
+        status      = coalesce(x.p->>'status', t.status),
+        description = case
+            when x.p->>'description' is null then t.description
+            when coalesce(x.p->>'description_mode', 'append') = 'replace'
+                 or coalesce(t.description, '') = '' then x.p->>'description'
+            else btrim(
+                t.description
+                || case when right(t.description, 1) = E'\n' then '' else E'\n\n' end
+                || (x.p->>'description'),
+                E' \t\r\n')
+        end,
+        plan = case
+            when x.p->>'plan' is null then t.plan
+            when coalesce(x.p->>'plan_mode', 'append') = 'replace'
+                 or coalesce(t.plan, '') = '' then x.p->>'plan'
+            else btrim(
+                t.plan
+                || case when right(t.plan, 1) = E'\n' then '' else E'\n' end
+                || (x.p->>'plan'),
+                E' \t\r\n')
+        end
+    from patches x
+    where t.id = x.id
+      and t.captain_id = p_captain_id
+    returning t.*;
+$$;
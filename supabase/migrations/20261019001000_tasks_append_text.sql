@@ -0,0 +1,73 @@
+-- Atomares Anhängen an tasks.description/plan (gleiche Trennregeln wie update_task)
+-- mit Längenbegrenzung: zu lange Texte verlieren den ANFANG (neueste Infos bleiben).
+create or replace function public.tasks_append_text(
+    p_old     text,
+    p_new     text,
+    p_sep     text,
+    p_max_len integer default 0
+)
+returns text
+language sql
+immutable
+as $$
+    select case
+               when p_max_len > 1 and length(v) > p_max_len
+                   then '…' || right(v, p_max_len - 1)
+               else v
+           end
+    from (
+        select btrim(
+                   case
+                       when p_new is null then coalesce(p_old, '')
+                       when coalesce(p_old, '') = '' then p_new
+                       when right(p_old, 1) = E'\n' then p_old || p_new
+                       else p_old || coalesce(p_sep, '') || p_new
+                   end,
+                   E' \t\r\n'
+               ) as v
+    ) s;
+$$;
+
+-- tasks_bulk_update: Append über tasks_append_text + Längenlimit
+drop function if exists public.tasks_bulk_update(uuid, jsonb);
+
+create or replace function public.tasks_bulk_update(
+    p_captain_id uuid,
+    p_patches    jsonb,
+    p_max_len    integer default 0
+)
+returns setof public.tasks
+language sql
+as $$
+    with patches as (
+        select distinct on ((p->>'id')::uuid)
+               (p->>'id')::uuid as id,
+               p
+        from jsonb_array_elements(coalesce(p_patches, '[]'::jsonb))
+             with ordinality as x(p, ord)
+        where p ? 'id'
+        order by (p->>'id')::uuid, ord desc  -- mehrfach gepatcht → letzter gewinnt
+    )
+    update public.tasks t
+    set issue_key   = coalesce(x.p->>'issue_key', t.issue_key),
+        title       = coalesce(x.p->>'title', t.title),
+        reason      = coalesce(x.p->>'reason', t.reason),
+        priority    = coalesce(x.p->>'priority', t.priority),
+        status      = coalesce(x.p->>'status', t.status),
+        description = case
+            when x.p->>'description' is null then t.description
+            when coalesce(x.p->>'description_mode', 'append') = 'replace'
+                then public.tasks_append_text(null, x.p->>'description', '', p_max_len)
+            else public.tasks_append_text(t.description, x.p->>'description', E'\n\n', p_max_len)
+        end,
+        plan = case
+            when x.p->>'plan' is null then t.plan
+            when coalesce(x.p->>'plan_mode', 'append') = 'replace'
+                then public.tasks_append_text(null, x.p->>'plan', '', p_max_len)
+            else public.tasks_append_text(t.plan, x.p->>'plan', E'\n', p_max_len)
+        end
+    from patches x
+    where t.id = x.id
+      and t.captain_id = p_captain_id
+    returning t.*;
+$$;
@@ -0,0 +1,72 @@
+-- Plan-Historie: Inhalts-Hash je Version + atomares Anhängen.
+-- captains.plan hat Schreiber außerhalb der Historie (Frontend) und Historien-Writes
+-- können fehlschlagen. Ein Delta wird daher nur noch angehängt, wenn sein Ausgangsstand
+-- (p_base_hash) dem Kopf der Historie entspricht – sonst Snapshot. Die Versionsnummer
+-- wird unter einem Advisory-Lock je Captain vergeben (keine Kollision bei parallelen Saves).
+alter table public.captain_plan_history
+    add column if not exists plan_hash text;
+
+create or replace function public.captain_plan_history_append(
+    p_captain_id     uuid,
+    p_plan           jsonb,
+    p_plan_hash      text,
+    p_ops            jsonb   default null,  -- null → Snapshot erzwingen
+    p_base           jsonb   default null,  -- Ausgangsstand (nur für leere Historie)
+    p_base_hash      text    default null,
+    p_snapshot_every integer default 20
+)
+returns integer
+language plpgsql
+as $$
+declare
+    head_version integer;
+    head_hash    text;
+    v            integer;
+begin
+    perform pg_advisory_xact_lock(hashtext('captain_plan_history:' || p_captain_id::text));
+
+    select h.version, h.plan_hash
+    into head_version, head_hash
+    from public.captain_plan_history h
+    where h.captain_id = p_captain_id
+    order by h.version desc
+    limit 1;
+
+    if head_version is null then
+        head_version := 0;
+        -- Historie startet mit bereits bestehendem Plan → Ausgangsstand sichern
+        if p_base is not null and jsonb_array_length(p_base) > 0 then
+            head_version := 1;
+            head_hash := p_base_hash;
+            insert into public.captain_plan_history
+                (captain_id, version, kind, payload, op_count, item_count, plan_hash)
+            values
+                (p_captain_id, 1, 'snapshot', p_base, 0, jsonb_array_length(p_base), p_base_hash);
+        end if;
+    end if;
+
+    -- Unverändert gegenüber dem Kopf → keine neue Version
+    if head_version > 0 and head_hash is not distinct from p_plan_hash then
+        return head_version;
+    end if;
+
+    v := head_version + 1;
+    if p_ops is not null
+       and v > 1
+       and (v - 1) % greatest(p_snapshot_every, 1) <> 0
+       and head_hash is not null
+       and head_hash = p_base_hash then
+        insert into public.captain_plan_history
+            (captain_id, version, kind, payload, op_count, item_count, plan_hash)
+        values
+            (p_captain_id, v, 'delta', p_ops, jsonb_array_length(p_ops),
+             jsonb_array_length(p_plan), p_plan_hash);
+    else
+        insert into public.captain_plan_history
+            (captain_id, version, kind, payload, op_count, item_count, plan_hash)
+        values
+            (p_captain_id, v, 'snapshot', p_plan, 0, jsonb_array_length(p_plan), p_plan_hash);
+    end if;
+    return v;
+end;
+$$;
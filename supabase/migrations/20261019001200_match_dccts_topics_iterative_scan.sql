@@ -0,0 +1,47 @@
+-- match_dccts_topics: Scope- und Similarity-Filter greifen erst nach dem HNSW-Scan
+-- (ef_search Kandidaten). Bei vielen Scopes blieb das Top-k eines Scopes daher oft leer.
+-- Iterativer Scan (pgvector >= 0.8) liest weiter, bis genug gefilterte Treffer da sind;
+-- relaxed_order → äußeres ORDER BY stellt die exakte Reihenfolge wieder her.
+create or replace function public.match_dccts_topics(
+    query_embedding extensions.vector(1536),
+    match_scope     text    default null,
+    match_count     integer default 8,
+    min_similarity  float   default 0
+)
+returns table (
+    topic_id      text,
+    title         text,
+    scope         text,
+    labels        text[],
+    status        text,
+    summary       text,
+    anchors       text[],
+    last_event_ts timestamptz,
+    similarity    float
+)
+language sql
+stable
+set search_path = public, extensions
+set hnsw.iterative_scan = relaxed_order
+set hnsw.ef_search = 100
+as $$
+    select m.*
+    from (
+        select t.topic_id,
+               t.title,
+               t.scope,
+               t.labels,
+               t.status,
+               t.summary,
+               t.anchors,
+               t.last_event_ts,
+               1 - (t.embedding <=> query_embedding) as similarity
+        from public.dccts_topics t
+        where t.embedding is not null
+          and (match_scope is null or t.scope = match_scope)
+          and t.embedding <=> query_embedding <= 1 - min_similarity
+        order by t.embedding <=> query_embedding
+        limit greatest(1, least(match_count, 50))
+    ) m
+    order by m.similarity desc;
+$$;
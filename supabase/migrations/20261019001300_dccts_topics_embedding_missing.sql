@@ -0,0 +1,4 @@
+-- Backfill-Loop: Topics ohne Embedding über einen kleinen Partial-Index finden
+create index if not exists dccts_topics_embedding_missing_idx
+    on public.dccts_topics (topic_id)
+    where embedding is null;
@@ -0,0 +1,44 @@
+-- dccts_issues_changed_since: älteste Issues zuerst und serverseitig begrenzt.
+-- Vorher newest-first ohne LIMIT → PostgREST max-rows schnitt die ÄLTESTEN ab und das
+-- Watermark sprang über sie hinweg. Jetzt fallen bei Begrenzung die jüngsten weg
+-- (liegen nach dem neuen Watermark → nächster Lauf). Issues mit demselben last_ts wie
+-- das erste zurückgestellte werden nicht aufgeteilt.
+drop function if exists public.dccts_issues_changed_since(uuid, timestamptz);
+
+create or replace function public.dccts_issues_changed_since(
+    p_captain_id uuid,
+    p_since      timestamptz,
+    p_limit      integer default 1000
+)
+returns table (
+    issue_key text,
+    last_ts   timestamptz
+)
+language sql
+stable
+as $$
+    with changed as (
+        select coalesce(e.object_key, 'unknown') as issue_key, max(e.ts) as last_ts
+        from public.dccts_events e
+        where e.captain_id = p_captain_id
+          and e.ts > p_since
+        group by 1
+    ),
+    ranked as (
+        select c.*, row_number() over (order by c.last_ts, c.issue_key) as rn
+        from changed c
+    ),
+    cut as (
+        select (select r.last_ts from ranked r
+                where r.rn = greatest(coalesce(p_limit, 1000), 1) + 1) as ts,  -- erstes zurückgestelltes
+               (select min(r.last_ts) from ranked r)                         as min_ts
+    )
+    select r.issue_key, r.last_ts
+    from ranked r, cut c
+    where case
+              when c.ts is null then true              -- alles passt ins Limit
+              when c.min_ts < c.ts then r.last_ts < c.ts -- Tie-Gruppe am Schnitt zurückstellen
+              else r.last_ts = c.ts                    -- nur eine Tie-Gruppe: komplett nehmen
+          end
+    order by r.last_ts, r.issue_key;
+$$;